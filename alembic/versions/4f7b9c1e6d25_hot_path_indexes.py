@@ -0,0 +1,87 @@
+"""Hot path indexes
+
+Revision ID: 4f7b9c1e6d25
+Revises: 8c41d2e7a9b3
+Create Date: 2026-10-18 16:21:07.513482
+
+Indexes are built with CREATE INDEX CONCURRENTLY outside of the migration
+transaction, so writes to the tables are not blocked while they are built.
+If a concurrent build fails, it leaves an invalid index behind, which is
+why every index is dropped first, if exists, and the migration can be
+simply rerun.
+
+Before the unique index on userposition (user_id, position_id) is built,
+repeated assignments of the same employee to the same position are
+deleted, keeping the one with the lowest id. They carry no data but
+their ids, and the amount of deleted rows is logged.
+
+"""
+import logging
+from typing import Any, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import context, op
+
+logger = logging.getLogger(f"alembic.runtime.migration.{__name__}")
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f7b9c1e6d25'
+down_revision: Union[str, None] = '8c41d2e7a9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES: tuple[tuple[str, str, list[str], dict[str, Any]], ...] = (
+    ('ix_department_path_gist', 'department', ['path'], {'postgresql_using': 'gist'}),
+    ('ix_department_parent_department', 'department', ['parent_department'], {}),
+    ('ix_department_head_id', 'department', ['head_id'], {}),
+    ('ix_position_department_id', 'position', ['department_id'], {}),
+    ('ix_userposition_position_id', 'userposition', ['position_id'], {}),
+    ('uq_userposition_user_id_position_id', 'userposition', ['user_id', 'position_id'], {'unique': True}),
+    ('ix_user_company_id', 'user', ['company_id'], {}),
+)
+
+
+def upgrade() -> None:
+    # Unique index can not be built while duplicated assignments exist.
+    deduplicate = sa.text(
+        'DELETE FROM userposition AS duplicate '
+        'USING userposition AS original '
+        'WHERE duplicate.user_id = original.user_id '
+        'AND duplicate.position_id = original.position_id '
+        'AND duplicate.id > original.id'
+    )
+    if context.is_offline_mode():
+        op.execute(deduplicate)
+    else:
+        deleted = op.get_bind().execute(deduplicate).rowcount
+        logger.warning(
+            'Deleted %d duplicated rows of userposition', deleted,
+        )
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                **kwargs,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -1,7 +1,11 @@
 import asyncio
 
-from fastapi import APIRouter, Depends, HTTPException
-from starlette.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -51,3 +55,15 @@ async def health_check(
     )
 
     return {"status": "OK"}
+
+
+@router.get(
+    path="/readyz/",
+    tags=["healthz"],
+    status_code=HTTP_200_OK,
+)
+async def readiness_check(request: Request):
+    """Check that application has finished warming up."""
+    if not getattr(request.app.state, "ready", False):
+        raise HTTPException(status_code=HTTP_503_SERVICE_UNAVAILABLE)
+    return {"status": "OK"}
@@ -1,15 +1,25 @@
 from http import HTTPStatus
+from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 
 from app.schemas.department import (
+    DepartmentBreadcrumb,
     DepartmentOut,
     DepartmentIn,
     DepartmentHead,
+    DepartmentHeadcountOut,
+    DepartmentTreeOut,
     DepartmentUpdate,
+    OrgChartImport,
+    OrgChartOut,
 )
 from app.services.department import DepartmentService
 from app.api.v1.routers.auth import auth_required_dep
+from app.schemas.exports import ExportFormat
+from app.schemas.pagination import Page
+from app.utils.exports import EXPORT_MEDIA_TYPES
 
 router = APIRouter(
     prefix="/departments",
@@ -28,16 +38,94 @@ async def create_department(
     return await service.create_department(department)
 
 
+@router.post(
+    "/import",
+    response_model=OrgChartOut,
+)
+async def import_org_chart(
+    current_user: auth_required_dep,
+    chart: OrgChartImport,
+    service: DepartmentService = Depends(DepartmentService),
+):
+    return await service.import_org_chart(current_user, chart)
+
+
+@router.get("/export")
+async def export_departments(
+    current_user: auth_required_dep,
+    export_format: ExportFormat = Query(ExportFormat.JSONL, alias="format"),
+    service: DepartmentService = Depends(DepartmentService),
+) -> StreamingResponse:
+    return StreamingResponse(
+        service.export_departments(current_user, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+    )
+
+
+@router.get(
+    "/tree",
+    response_model=list[DepartmentTreeOut],
+)
+async def get_tree(
+    current_user: auth_required_dep,
+    root_id: Optional[int] = None,
+    depth: Optional[int] = Query(None, ge=1),
+    include_heads: bool = False,
+    include_positions: bool = False,
+    service: DepartmentService = Depends(DepartmentService),
+):
+    return await service.get_tree(
+        current_user,
+        root_id,
+        depth,
+        include_heads,
+        include_positions,
+    )
+
+
+@router.get(
+    "/ancestors",
+    response_model=list[DepartmentBreadcrumb],
+)
+async def get_breadcrumbs(
+    current_user: auth_required_dep,
+    ids: list[int] = Query(..., min_length=1),
+    include_heads: bool = False,
+    service: DepartmentService = Depends(DepartmentService),
+):
+    return await service.get_breadcrumbs(current_user, ids, include_heads)
+
+
 @router.get(
     "/{department_id}/sub_departments",
-    response_model=list[DepartmentOut],
+    response_model=Page[DepartmentOut],
+)
+async def get_sub_departments(
+    current_user: auth_required_dep,
+    department_id: int,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    service: DepartmentService = Depends(DepartmentService),
+):
+    return await service.get_sub_departments(
+        current_user,
+        department_id,
+        limit,
+        cursor,
+    )
+
+
+@router.get(
+    "/{department_id}/headcount",
+    response_model=DepartmentHeadcountOut,
 )
-async def get_all_sub_departments(
+async def get_headcount(
     current_user: auth_required_dep,
     department_id: int,
     service: DepartmentService = Depends(DepartmentService),
 ):
-    return await service.get_all_sub_departments(department_id)
+    """Get amounts of position assignments in the department and subtree."""
+    return await service.get_headcount(current_user, department_id)
 
 
 @router.post("{department_id}/set_head")
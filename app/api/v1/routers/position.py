@@ -1,16 +1,20 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 
 from app.schemas.position import (
     PositionOut,
     PositionIn,
     UserPositionIn,
     UserPositionOut,
+    UserPositionResult,
     PositionUpdate,
 )
 from app.services.position import PositionService
 from app.api.v1.routers.auth import auth_required_dep
+from app.schemas.exports import ExportFormat
+from app.utils.exports import EXPORT_MEDIA_TYPES
 
 router = APIRouter(
     prefix="/positions",
@@ -41,6 +45,30 @@ async def assign_position(
     return await service.assign_position(assignee)
 
 
+@router.post(
+    "/assign",
+    response_model=list[UserPositionResult],
+)
+async def assign_positions(
+    current_user: auth_required_dep,
+    assignees: list[UserPositionIn],
+    service: PositionService = Depends(PositionService),
+):
+    return await service.assign_positions(current_user, assignees)
+
+
+@router.get("/export")
+async def export_positions(
+    current_user: auth_required_dep,
+    export_format: ExportFormat = Query(ExportFormat.JSONL, alias="format"),
+    service: PositionService = Depends(PositionService),
+) -> StreamingResponse:
+    return StreamingResponse(
+        service.export_positions(current_user, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+    )
+
+
 @router.get(
     "/{position_id}",
     response_model=PositionOut,
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 
 from app.schemas.auth import InviteChallenge
+from app.schemas.imports import ImportFormat, ImportReport
 from app.schemas.user import UserOut, EmployeeAccount, UserCredentials
 from app.services.user import UserService
 from app.api.v1.routers.auth import auth_required_dep
+from app.schemas.exports import ExportFormat
+from app.utils.exports import EXPORT_MEDIA_TYPES
+from app.utils.imports import iter_import_records
 
 router = APIRouter(
     prefix="/users",
@@ -62,3 +67,31 @@ async def change_credentials(
         current_user,
         new_credentials.model_dump(),
     )
+
+
+@router.post(
+    "/import",
+    response_model=ImportReport,
+)
+async def import_employees(
+    request: Request,
+    current_user: auth_required_dep,
+    import_format: ImportFormat = Query(ImportFormat.CSV, alias="format"),
+    service: UserService = Depends(UserService),
+) -> ImportReport:
+    return await service.import_employees(
+        current_user,
+        iter_import_records(request.stream(), import_format),
+    )
+
+
+@router.get("/export")
+async def export_employees(
+    current_user: auth_required_dep,
+    export_format: ExportFormat = Query(ExportFormat.JSONL, alias="format"),
+    service: UserService = Depends(UserService),
+) -> StreamingResponse:
+    return StreamingResponse(
+        service.export_employees(current_user, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+    )
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 import os
 
 from pydantic import BaseModel
@@ -14,6 +15,73 @@ class AuthJWT(BaseModel):
     public_key_path: Path = BASE_DIR / "certs" / "jwt-public.pem"
     algorithm: str = "RS256"
     access_token_expires_minutes: int = 15
+    verified_tokens_cache_size: int = 10_000
+    principals_cache_size: int = 10_000
+    # A change of account or credentials drops the cached principal only
+    # in the worker, which committed it. Other workers keep serving the
+    # old principal, e.g. with the old role, for up to this many seconds.
+    principals_cache_ttl_seconds: int = 60
+
+
+class PasswordHashing(BaseModel):
+    """Config for the pool, which runs bcrypt off the event loop."""
+
+    executor: Literal["thread", "process"] = "thread"
+    max_workers: int = 4
+    max_queue_size: int = 64
+
+
+class EmailValidation(BaseModel):
+    """Config for validation of emails and their domains."""
+
+    check_deliverability: bool = True
+    dns_timeout: float = 2.0
+    cache_size: int = 10_000
+    cache_ttl_seconds: int = 3600
+    negative_cache_ttl_seconds: int = 300
+
+
+class DataImport(BaseModel):
+    """Config for bulk imports of employees and departments."""
+
+    batch_size: int = 1000
+    max_assignments: int = 1000
+    # Maximum length of a CSV record, spanning several lines because of
+    # a quoted value, before it is reported as not closed.
+    max_csv_record_size: int = 65_536
+
+
+class Pagination(BaseModel):
+    """Config for keyset pagination of list endpoints."""
+
+    default_limit: int = 50
+    max_limit: int = 500
+    max_tree_size: int = 5_000
+
+
+class DepartmentCache(BaseModel):
+    """Config for cache of department subtrees."""
+
+    max_entries: int = 10_000
+    max_departments: int = 500_000
+    max_companies: int = 10_000
+
+
+class Database(BaseModel):
+    """Config for database access and connection pools."""
+
+    use_savepoints: bool = False
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = -1
+    pool_pre_ping: bool = False
+    statement_cache_size: int = 100
+    warm_up_connections: int = 5
+    warm_up_retry_delay: float = 1.0
+    warm_up_max_retry_delay: float = 30.0
+    bulk_batch_size: int = 1000
+    stream_batch_size: int = 1000
 
 
 class Settings(BaseSettings):
@@ -27,12 +95,20 @@ class Settings(BaseSettings):
         f":{os.getenv('DB_PORT')}/"
         f"{os.getenv('DB_NAME')}"
     )
+    postgres_read_only_db_url: str | None = None
     secret: str = "VERY_SECRET_SECRET"
     model_config = SettingsConfigDict(
         env_file=".env",
         extra="ignore",
+        env_nested_delimiter="__",
     )
     auth_jwt: AuthJWT = AuthJWT()
+    password_hashing: PasswordHashing = PasswordHashing()
+    database: Database = Database()
+    email_validation: EmailValidation = EmailValidation()
+    data_import: DataImport = DataImport()
+    pagination: Pagination = Pagination()
+    department_cache: DepartmentCache = DepartmentCache()
 
 
 settings = Settings()
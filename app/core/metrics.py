@@ -0,0 +1,60 @@
+"""
+Application-specific Prometheus metrics.
+
+All metrics are registered in the default registry, so they are served
+by the ``/metrics`` endpoint exposed by ``Instrumentator``.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+PASSWORD_HASHING_JOBS_RUNNING = Gauge(
+    "password_hashing_jobs_running",
+    "Number of bcrypt jobs being executed by workers of the pool.",
+)
+PASSWORD_HASHING_JOBS_QUEUED = Gauge(
+    "password_hashing_jobs_queued",
+    "Number of bcrypt jobs waiting for a free worker of the pool.",
+)
+PASSWORD_HASHING_DURATION = Histogram(
+    "password_hashing_duration_seconds",
+    "Time spent on bcrypt jobs, including waiting in the queue.",
+    labelnames=("operation",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Lookups in in-process caches, labelled by cache and result.",
+    labelnames=("cache", "result"),
+)
+CACHE_ENTRIES = Gauge(
+    "cache_entries",
+    "Number of entries stored in in-process caches.",
+    labelnames=("cache",),
+)
+CACHE_WEIGHT = Gauge(
+    "cache_weight",
+    "Total weight of entries stored in in-process caches, for caches"
+    " bounded by weight.",
+    labelnames=("cache",),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Number of connections currently checked out from the pool.",
+    labelnames=("pool",),
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Number of connections opened above pool_size.",
+    labelnames=("pool",),
+)
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "db_pool_checkout_duration_seconds",
+    "Time spent waiting for a connection from the pool.",
+    labelnames=("pool",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Number of checkouts, which failed because the pool was exhausted.",
+    labelnames=("pool",),
+)
@@ -1,14 +1,65 @@
 from collections.abc import AsyncGenerator
 
+from typing import Any
+
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     create_async_engine,
     async_sessionmaker,
     AsyncSession,
 )
 
 from app.core.config import settings
+from app.database.pool import InstrumentedAsyncQueuePool
+
+
+def create_pooled_engine(
+    url: str,
+    name: str,
+    connect_args: dict[str, Any] | None = None,
+    **kwargs: Any,
+) -> AsyncEngine:
+    """
+    Create engine with connection pool configured from settings.
+
+    :param url: database URL.
+    :param name: name of the pool, used in logs and metrics.
+    :param connect_args: additional arguments for asyncpg connections.
+    :param kwargs: additional arguments for the engine.
+    :return: created engine.
+    """
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_logging_name=name,
+        pool_size=settings.database.pool_size,
+        max_overflow=settings.database.max_overflow,
+        pool_timeout=settings.database.pool_timeout,
+        pool_recycle=settings.database.pool_recycle,
+        pool_pre_ping=settings.database.pool_pre_ping,
+        connect_args={
+            "prepared_statement_cache_size": (
+                settings.database.statement_cache_size
+            ),
+            **(connect_args or {}),
+        },
+        **kwargs,
+    )
 
-async_engine = create_async_engine(settings.postgres_db_url)
+
+async_engine = create_pooled_engine(settings.postgres_db_url, "primary")
+
+# Engine for read-only work, which may point to a replica. Connections
+# run in autocommit mode with read-only transactions by default, so that
+# reads don't pay for BEGIN/COMMIT round trips and can't write anything.
+read_only_async_engine = create_pooled_engine(
+    settings.postgres_read_only_db_url or settings.postgres_db_url,
+    "read_only",
+    connect_args={
+        "server_settings": {"default_transaction_read_only": "on"},
+    },
+    isolation_level="AUTOCOMMIT",
+)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=async_engine,
@@ -18,8 +69,22 @@ AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
 )
 
+ReadOnlySessionLocal = async_sessionmaker(
+    bind=read_only_async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+    autocommit=False,
+)
+
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """Create session for database."""
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def dispose_engines() -> None:
+    """Close all pooled connections of all engines."""
+    await async_engine.dispose()
+    await read_only_async_engine.dispose()
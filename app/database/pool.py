@@ -0,0 +1,53 @@
+import time
+from typing import TYPE_CHECKING
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_DURATION,
+    DB_POOL_OVERFLOW,
+    DB_POOL_TIMEOUTS,
+)
+
+if TYPE_CHECKING:
+    from sqlalchemy.pool import ConnectionPoolEntry, PoolProxiedConnection
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool, which reports its state to Prometheus.
+
+    Pool is labelled in metrics by its ``pool_logging_name``.
+    """
+
+    @property
+    def label(self) -> str:
+        """Get name of the pool, used as metrics label."""
+        return self._orig_logging_name or "default"
+
+    def connect(self) -> "PoolProxiedConnection":
+        """Check out a connection, measuring time spent on waiting."""
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.labels(self.label).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_DURATION.labels(self.label).observe(
+                time.perf_counter() - started,
+            )
+        self._report_usage()
+        return connection
+
+    def _do_return_conn(self, record: "ConnectionPoolEntry") -> None:
+        """Return connection to the pool."""
+        super()._do_return_conn(record)
+        self._report_usage()
+
+    def _report_usage(self) -> None:
+        """Export amount of used connections."""
+        DB_POOL_CHECKED_OUT.labels(self.label).set(self.checkedout())
+        DB_POOL_OVERFLOW.labels(self.label).set(max(self.overflow(), 0))
@@ -0,0 +1,90 @@
+"""Warm-up of connection pools, performed at application startup."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.database.db import async_engine, read_only_async_engine
+from app.models.company import Department
+from app.models.user import User
+from app.repositories.auth import AuthRepository
+from app.repositories.department import DepartmentRepository
+from app.repositories.user import UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+async def _lookup_user_by_account(session: AsyncSession) -> None:
+    await UserRepository(session, User).get_by_query_one_or_none(account="")
+
+
+async def _lookup_principal_by_id(session: AsyncSession) -> None:
+    await AuthRepository(session, User).get_by_query_one_or_none(id=0)
+
+
+async def _lookup_department_by_id(session: AsyncSession) -> None:
+    await DepartmentRepository(
+        session,
+        Department,
+    ).get_by_query_one_or_none(id=0)
+
+
+# Statements of the hottest repository calls. They are executed exactly
+# the way repositories build them, so that both SQLAlchemy compiled cache
+# and asyncpg prepared statements cache of every connection are primed.
+HOT_STATEMENTS: tuple[Callable[[AsyncSession], Awaitable[None]], ...] = (
+    _lookup_user_by_account,
+    _lookup_principal_by_id,
+    _lookup_department_by_id,
+)
+
+
+async def _prime_connection(connection: AsyncConnection) -> None:
+    """Prepare hot statements on given connection."""
+    async with AsyncSession(bind=connection) as session:
+        for statement in HOT_STATEMENTS:
+            await statement(session)
+
+
+async def warm_up_engine(engine: AsyncEngine, connections: int) -> None:
+    """
+    Open given number of pooled connections and prime them.
+
+    Connections are held simultaneously, so that the pool ends up with
+    that many distinct established connections.
+
+    :param engine: engine to warm up.
+    :param connections: number of connections to open.
+    """
+    async with AsyncExitStack() as stack:
+        opened = await asyncio.gather(
+            *(
+                stack.enter_async_context(engine.connect())
+                for _ in range(connections)
+            ),
+        )
+        await asyncio.gather(*map(_prime_connection, opened))
+
+
+async def warm_up_database() -> bool:
+    """
+    Warm up connection pools of all engines, logging failures.
+
+    :return: whether all engines were warmed up.
+    """
+    connections = min(
+        settings.database.warm_up_connections,
+        settings.database.pool_size,
+    )
+    succeeded = True
+    for engine in (async_engine, read_only_async_engine):
+        try:
+            await warm_up_engine(engine, connections)
+        except Exception:
+            logger.exception("Failed to warm up %s", engine.pool.logging_name)
+            succeeded = False
+    return succeeded
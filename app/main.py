@@ -1,8 +1,51 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from prometheus_fastapi_instrumentator import Instrumentator
 
 from app.api import router
+from app.core.config import settings
+from app.database.db import dispose_engines
+from app.database.warm_up import warm_up_database
+from app.utils.auth import password_hashing_pool
+
+
+async def warm_up(app: FastAPI) -> None:
+    """
+    Warm up connection pools and mark the application as ready.
+
+    Failed warm-up is retried with exponential backoff, the application
+    stays not ready until it succeeds.
+    """
+    delay = settings.database.warm_up_retry_delay
+    while not await warm_up_database():
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, settings.database.warm_up_max_retry_delay)
+    app.state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Manage application resources.
+
+    Connection pools are warmed up in background, readiness check
+    reports OK only once warm-up is finished. On shutdown all pooled
+    connections and password hashing workers are released.
+    """
+    app.state.ready = False
+    warm_up_task = asyncio.create_task(warm_up(app))
+    yield
+    app.state.ready = False
+    warm_up_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await warm_up_task
+    await asyncio.to_thread(password_hashing_pool.shutdown)
+    await dispose_engines()
+
 
-app = FastAPI(docs_url="/swagger")
+app = FastAPI(docs_url="/swagger", lifespan=lifespan)
 app.include_router(router, prefix="/api")
 Instrumentator().instrument(app).expose(app)
@@ -13,6 +13,7 @@ class InviteChallenge(Base):
             "invite_token",
             name="invite_token_unique",
         ),
+        UniqueConstraint("account", name="unique_invite_account"),
     )
 
     account: Mapped[str] = mapped_column(String)
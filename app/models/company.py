@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, ForeignKey, String, UniqueConstraint
+from sqlalchemy import Index, Integer, ForeignKey, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy_utils import Ltree
 from sqlalchemy_utils.types import LtreeType
@@ -11,6 +11,11 @@ class Company(Base):
     """Database model for company."""
 
     company_name: Mapped[str] = mapped_column(String, unique=True)
+    departments_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+    )
     users: Mapped[list["User"]] = relationship(
         "User",
         back_populates="company",
@@ -27,6 +32,7 @@ class Department(Base):
     __table_args__ = (
         UniqueConstraint("company_id", "path", name="unique_path"),
         UniqueConstraint("company_id", "name", name="unique_department_name"),
+        Index("ix_department_path_gist", "path", postgresql_using="gist"),
     )
 
     name: Mapped[str] = mapped_column(String, nullable=False)
@@ -35,12 +41,28 @@ class Department(Base):
         Integer,
         ForeignKey("department.id"),
         nullable=True,
+        index=True,
     )
     company_id: Mapped[int] = mapped_column(Integer, ForeignKey("company.id"))
     head_id: Mapped[int] = mapped_column(
         Integer,
         ForeignKey("user.id"),
         nullable=True,
+        index=True,
+    )
+    # Amounts of position assignments (not of distinct employees) in the
+    # department itself and in the department together with all its
+    # descendants. Maintained by PositionRepository on every assignment
+    # and on every move of a position to another department.
+    headcount: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+    )
+    subtree_headcount: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
     )
 
     parent: Mapped["Department"] = relationship(
@@ -81,6 +103,7 @@ class Position(Base):
     department_id: Mapped[int] = mapped_column(
         Integer,
         ForeignKey("department.id"),
+        index=True,
     )
 
     department: Mapped["Department"] = relationship(
@@ -94,12 +117,28 @@ class Position(Base):
 
 
 class UserPosition(Base):
-    """Mapping table for employees and their positions."""
+    """
+    Mapping table for employees and their positions.
+
+    The unique index on ``(user_id, position_id)`` also serves lookups by
+    ``user_id``, so only ``position_id`` has an index of its own. Migration
+    ``4f7b9c1e6d25``, which created it, deleted repeated assignments.
+    """
+
+    __table_args__ = (
+        Index(
+            "uq_userposition_user_id_position_id",
+            "user_id",
+            "position_id",
+            unique=True,
+        ),
+    )
 
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"))
     position_id: Mapped[int] = mapped_column(
         Integer,
         ForeignKey("position.id"),
+        index=True,
     )
 
     user: Mapped["User"] = relationship(
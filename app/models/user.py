@@ -33,5 +33,9 @@ class User(Base):
         "Department",
         back_populates="head",
     )
-    company_id: Mapped[int] = mapped_column(Integer, ForeignKey("company.id"))
+    company_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("company.id"),
+        index=True,
+    )
     user_positions = relationship("UserPosition", back_populates="user")
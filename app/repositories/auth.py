@@ -5,7 +5,7 @@ from jwt import InvalidTokenError
 from app.repositories.base import SqlAlchemyRepository
 from app.models.base import Base
 from app.models.user import User
-from app.utils.auth import encode_jwt, decode_jwt
+from app.utils.auth import encode_jwt, decode_jwt_cached
 
 
 Model = TypeVar("Model", bound=Base)
@@ -28,6 +28,9 @@ class AuthRepository(SqlAlchemyRepository):
         :return: encoded JWT-token.
         """
         jwt_payload: dict = {
+            "user_id": user.id,
+            "company_id": user.company_id,
+            "role": user.role.value,
             "first_name": user.first_name,
             "last_name": user.last_name,
             "account": user.account,
@@ -43,7 +46,7 @@ class AuthRepository(SqlAlchemyRepository):
         :return: decoded token.
         """
         try:
-            decoded = decode_jwt(token)
+            decoded = decode_jwt_cached(token)
         except InvalidTokenError as error:
             raise RuntimeError from error
         return decoded
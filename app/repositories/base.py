@@ -1,3 +1,4 @@
+from collections.abc import AsyncIterator
 from typing import (
     Any,
     Sequence,
@@ -8,14 +9,16 @@ from typing import (
     Protocol,
 )
 
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import cast, column, delete, insert, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.models.base import Base
 
 if TYPE_CHECKING:
-    from sqlalchemy import Insert, Select, Update, Delete
-    from sqlalchemy.engine import Result
+    from sqlalchemy import ColumnElement, Insert, Select, Update, Delete
+    from sqlalchemy.engine import Result, ScalarResult
 
 Model = TypeVar("Model", bound=Base)
 
@@ -47,6 +50,24 @@ class AbstractRepository(Protocol):
         """Create single object and return it."""
         ...
 
+    async def add_many(
+        self,
+        rows: Sequence[dict[str, Any]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Sequence[Model]:
+        """Create many objects and return them."""
+        ...
+
+    async def upsert_many(
+        self,
+        rows: Sequence[dict[str, Any]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Sequence[Model]:
+        """Create many objects, resolving conflicts, and return them."""
+        ...
+
     async def get_by_query_one_or_none(
         self,
         *args: Any,
@@ -55,12 +76,20 @@ class AbstractRepository(Protocol):
         """Get single object or None if not found."""
         ...
 
-    async def get_by_query_all(
+    def stream_by_query(
+        self,
+        *args: Any,
+        **kwargs: Any,
+    ) -> AsyncIterator[Model]:
+        """Stream objects, without loading all of them into memory."""
+        ...
+
+    async def get_page(
         self,
         *args: Any,
         **kwargs: Any,
-    ) -> Optional[Sequence[Model]]:
-        """Get sequence of objects or None if not found."""
+    ) -> tuple[Sequence[Model], bool]:
+        """Get a page of objects and whether there are more of them."""
         ...
 
     async def update_one_by_id(
@@ -71,6 +100,15 @@ class AbstractRepository(Protocol):
         """Update an object by it's id."""
         ...
 
+    async def update_many(
+        self,
+        rows: Sequence[dict[str, Any]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Sequence[Model]:
+        """Update many objects by their ids and return them."""
+        ...
+
     async def delete_by_query(self, *args: Any, **kwargs: Any) -> None:
         """Delete an object that meets the query."""
         ...
@@ -128,21 +166,165 @@ class SqlAlchemyRepository:
         obj: Result = await self.session.execute(query)
         return obj.scalar_one()
 
+    async def add_many(
+        self,
+        rows: Sequence[dict[str, Any]],
+        batch_size: int | None = None,
+    ) -> Sequence[Model]:
+        """
+        Insert many objects and return them, in the same order.
+
+        Rows are sent with multi-row INSERT ... RETURNING statements,
+        ``batch_size`` rows per statement.
+
+        :param rows: data of objects to insert.
+        :param batch_size: amount of rows per statement.
+        :return: inserted objects.
+        """
+        if not rows:
+            return []
+        result: ScalarResult = await self.session.scalars(
+            insert(self.model).returning(
+                self.model,
+                sort_by_parameter_order=True,
+            ),
+            list(rows),
+            execution_options=self._bulk_options(batch_size),
+        )
+        return result.all()
+
+    async def upsert_many(
+        self,
+        rows: Sequence[dict[str, Any]],
+        index_elements: Sequence[str],
+        update_fields: Sequence[str] | None = None,
+        batch_size: int | None = None,
+    ) -> Sequence[Model]:
+        """
+        Insert many objects, resolving conflicts with ON CONFLICT.
+
+        If ``update_fields`` is None, conflicting rows are skipped,
+        otherwise given fields of existing rows are overwritten. Objects
+        are ordered by values of ``index_elements`` in Python, as
+        ``sort_by_parameter_order`` matches rows by generated ids, while
+        updated rows keep their old ones.
+
+        :param rows: data of objects to insert.
+        :param index_elements: columns of unique index to detect
+         conflicts on.
+        :param update_fields: fields to update on conflict.
+        :param batch_size: amount of rows per statement.
+        :return: inserted or updated objects, in the same order,
+         skipped rows are not returned.
+        """
+        if not rows:
+            return []
+        query = pg_insert(self.model)
+        if update_fields is None:
+            query = query.on_conflict_do_nothing(
+                index_elements=index_elements,
+            )
+        else:
+            query = query.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={field: query.excluded[field] for field in update_fields},
+            )
+        result: ScalarResult = await self.session.scalars(
+            query.returning(self.model),
+            list(rows),
+            execution_options=dict(
+                self._bulk_options(batch_size),
+                populate_existing=True,
+            ),
+        )
+        positions: dict[tuple, int] = {}
+        for position, row in enumerate(rows):
+            key = tuple(row[element] for element in index_elements)
+            positions.setdefault(key, position)
+        return sorted(
+            result.all(),
+            key=lambda obj: positions.get(
+                tuple(getattr(obj, element) for element in index_elements),
+                len(rows),
+            ),
+        )
+
     async def get_by_query_one_or_none(self, **kwargs: Any) -> Model | None:
         """Get an object by query or None if not found."""
         query: Select = select(self.model).filter_by(**kwargs)
         res: Result = await self.session.execute(query)
         return res.unique().scalar_one_or_none()
 
-    async def get_by_query_all(
+    async def get_page(
         self,
-        *args: Any,
+        limit: int,
+        after: Any = None,
+        *criteria: "ColumnElement[bool]",
+        key: Any = None,
         **kwargs: Any,
-    ) -> Optional[Sequence[Model]]:
-        """Get sequence of objects by query or None if not found."""
-        query: Select = select(self.model).filter_by(**kwargs)
-        res: Result = await self.session.execute(query)
-        return res.scalars().all()
+    ) -> tuple[Sequence[Model], bool]:
+        """
+        Get a page of objects by query, using keyset pagination.
+
+        Instead of OFFSET, rows are filtered by ``key > after``, so that
+        cost of a page doesn't depend on its position in the list. One
+        extra row is fetched to find out whether there is a next page.
+
+        :param limit: maximum amount of objects in the page.
+        :param after: value of ``key`` in the last object of
+         the previous page.
+        :param criteria: filters of the query, as SQL expressions.
+        :param key: unique column, the list is ordered by, id if None.
+        :param kwargs: filters of the query, by values of columns.
+        :return: objects of the page and whether there are more of them.
+        """
+        if key is None:
+            key = self.model.id
+        query: Select = select(self.model).where(*criteria).filter_by(**kwargs)
+        if after is not None:
+            query = query.where(key > after)
+        result: ScalarResult = await self.session.scalars(
+            query.order_by(key).limit(limit + 1),
+        )
+        objects = result.all()
+        return objects[:limit], len(objects) > limit
+
+    def stream_by_query(
+        self,
+        batch_size: int | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[Model]:
+        """
+        Stream objects by query, ordered by id.
+
+        :param batch_size: amount of rows fetched from server-side
+         cursor at once.
+        :param kwargs: filters of the query.
+        :return: async iterator of objects.
+        """
+        query: Select = (
+            select(self.model).filter_by(**kwargs).order_by(self.model.id)
+        )
+        return self._stream(query, batch_size)
+
+    async def _stream(
+        self,
+        query: "Select",
+        batch_size: int | None = None,
+    ) -> AsyncIterator[Model]:
+        """
+        Stream objects of the query through a server-side cursor.
+
+        Only ``batch_size`` rows are held in memory at once. Session
+        must be in a transaction, as cursors can't live outside of it.
+        """
+        result = await self.session.stream_scalars(
+            query.execution_options(
+                yield_per=batch_size or settings.database.stream_batch_size,
+            ),
+        )
+        async for obj in result:
+            yield obj
 
     async def update_one_by_id(
         self,
@@ -161,6 +343,58 @@ class SqlAlchemyRepository:
         obj: Result = await self.session.execute(query)
         return obj.scalar_one_or_none()
 
+    async def update_many(
+        self,
+        rows: Sequence[dict[str, Any]],
+        batch_size: int | None = None,
+    ) -> Sequence[Model]:
+        """
+        Update many objects by their ids and return them.
+
+        Every batch is updated with a single UPDATE ... FROM (VALUES ...)
+        RETURNING statement. All rows must have the same keys, including
+        ``id``.
+
+        :param rows: ids and new data of objects.
+        :param batch_size: amount of rows per statement.
+        :return: updated objects, not necessarily in the same order.
+        """
+        if not rows:
+            return []
+        columns = self.model.__table__.c
+        keys = list(rows[0])
+        batch_size = batch_size or settings.database.bulk_batch_size
+        updated: list[Model] = []
+        for start in range(0, len(rows), batch_size):
+            data = values(
+                *(column(key, columns[key].type) for key in keys),
+                name="data",
+            ).data(
+                [
+                    tuple(row[key] for key in keys)
+                    for row in rows[start : start + batch_size]
+                ],
+            )
+            query: Update = (
+                update(self.model)
+                .where(self.model.id == data.c.id)
+                .values(
+                    {
+                        key: cast(data.c[key], columns[key].type)
+                        for key in keys
+                        if key != "id"
+                    },
+                )
+                .returning(self.model)
+                .execution_options(
+                    synchronize_session=False,
+                    populate_existing=True,
+                )
+            )
+            result: ScalarResult = await self.session.scalars(query)
+            updated.extend(result.all())
+        return updated
+
     async def delete_by_query(self, **kwargs: Any) -> None:
         """Delete an object that meets the query."""
         query: Delete = delete(self.model).filter_by(**kwargs)
@@ -170,3 +404,12 @@ class SqlAlchemyRepository:
         """Delete all objects."""
         query: Delete = delete(self.model)
         await self.session.execute(query)
+
+    @staticmethod
+    def _bulk_options(batch_size: int | None) -> dict[str, Any]:
+        """Get execution options for multi-row INSERT statements."""
+        return dict(
+            insertmanyvalues_page_size=(
+                batch_size or settings.database.bulk_batch_size
+            ),
+        )
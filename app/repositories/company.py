@@ -1,18 +1,31 @@
-from typing import TYPE_CHECKING, TypeVar
+from typing import NamedTuple, Optional, TYPE_CHECKING, TypeVar
 
-from sqlalchemy import select, exists, insert
+from sqlalchemy import select, exists, literal, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
 
 from app.repositories.base import SqlAlchemyRepository
 from app.models.base import Base
 from app.models.auth import InviteChallenge
+from app.models.company import Company
+from app.models.user import Role, User
 from app.utils.auth import generate_invite_code
 
 if TYPE_CHECKING:
-    from sqlalchemy import Select, Insert, Result
+    from sqlalchemy import Select, Result, Update
 
 Model = TypeVar("Model", bound=Base)
 
 
+class InviteIssue(NamedTuple):
+    """Result of issuing an invite, with reasons why it was refused."""
+
+    invite: Optional[InviteChallenge]
+    account_taken: bool
+    token_exists: bool
+    inviter_is_admin: bool
+
+
 class CompanyRepository(SqlAlchemyRepository):
     """
     Repository class for Company model.
@@ -34,23 +47,55 @@ class CompanyRepository(SqlAlchemyRepository):
         )
         return await self.session.scalar(query)
 
-    async def generate_invite_code(self, account: str) -> InviteChallenge:
+    async def issue_invite(
+        self,
+        account: str,
+        inviter_id: int | None = None,
+    ) -> InviteIssue:
         """
-        Generate invitation code for given email.
+        Issue invitation code for given email in a single statement.
+
+        Invite is inserted only if the email is not taken by any user,
+        has no invite yet and, if ``inviter_id`` is given, the inviter
+        is an admin. Concurrent invites for the same email are resolved
+        by ``unique_invite_account`` constraint.
 
         :param account: email of the user.
-        :return: object of InviteChallenge model.
+        :param inviter_id: ID of the user, who invites an employee.
+        :return: issued invite, or None with reasons of refusal.
         """
-        query: Insert = (
-            insert(InviteChallenge)
-            .values(
-                account=account,
-                invite_token=generate_invite_code(),
+        account_taken = exists().where(User.account == account)
+        token_exists = exists().where(InviteChallenge.account == account)
+        inviter_is_admin = (
+            exists().where(User.id == inviter_id, User.role == Role.ADMIN)
+            if inviter_id is not None
+            else true()
+        )
+        inserted = (
+            pg_insert(InviteChallenge)
+            .from_select(
+                ["account", "invite_token"],
+                select(
+                    literal(account),
+                    literal(generate_invite_code()),
+                ).where(~account_taken, ~token_exists, inviter_is_admin),
             )
-            .returning(InviteChallenge)
+            .on_conflict_do_nothing()
+            .returning(*InviteChallenge.__table__.c)
+            .cte("inserted")
         )
-        obj: Result = await self.session.execute(query)
-        return obj.scalar_one()
+        query: Select = (
+            select(
+                aliased(InviteChallenge, inserted),
+                account_taken,
+                token_exists,
+                inviter_is_admin,
+            )
+            .select_from(select(literal(1)).subquery())
+            .outerjoin(inserted, true())
+        )
+        result: Result = await self.session.execute(query)
+        return InviteIssue(*result.one())
 
     async def verify_invite(self, account: str, invite_token: str) -> bool:
         """
@@ -78,3 +123,34 @@ class CompanyRepository(SqlAlchemyRepository):
             company_name=kwargs.get("company_name"),
         )
         return await self.add_one_and_get_obj(**company_data)
+
+    async def get_departments_version(self, company_id: int) -> int:
+        """
+        Get version of departments of the company.
+
+        :param company_id: ID of the company.
+        :return: current version, 0 if company does not exist.
+        """
+        query: Select = select(Company.departments_version).where(
+            Company.id == company_id,
+        )
+        return await self.session.scalar(query) or 0
+
+    async def bump_departments_version(self, company_id: int) -> int:
+        """
+        Increment version of departments of the company.
+
+        Must be called in the same transaction, which changes
+        departments, so that readers see new version and new
+        departments at the same time.
+
+        :param company_id: ID of the company.
+        :return: new version.
+        """
+        query: Update = (
+            update(Company)
+            .where(Company.id == company_id)
+            .values(departments_version=Company.departments_version + 1)
+            .returning(Company.departments_version)
+        )
+        return await self.session.scalar(query) or 0
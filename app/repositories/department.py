@@ -1,21 +1,74 @@
 from collections.abc import Sequence
-from typing import TYPE_CHECKING, TypeVar
+from enum import Enum
+from typing import NamedTuple, Optional, TYPE_CHECKING, TypeVar
 
-from sqlalchemy import select, update, func, cast, exists
+from sqlalchemy import (
+    JSON,
+    Integer,
+    String,
+    and_,
+    any_,
+    or_,
+    select,
+    update,
+    func,
+    cast,
+    exists,
+    literal,
+    true,
+)
+from sqlalchemy.dialects.postgresql import (
+    ARRAY,
+    aggregate_order_by,
+    insert as pg_insert,
+)
+from sqlalchemy.orm import aliased
 from sqlalchemy_utils import Ltree, LtreeType
 
-from app.models.company import Department
+from app.models.company import Department, Position
 from app.repositories.base import SqlAlchemyRepository
 from app.models.base import Base
 from app.models.user import User
-from app.utils.exceptions import ParentNotFoundError
+from app.utils.exceptions import DepartmentExistsError, ParentNotFoundError
 
 if TYPE_CHECKING:
-    from sqlalchemy import Select, ScalarResult, Result, Update
+    from sqlalchemy import ColumnElement, Select, ScalarResult, Result, Update
 
 Model = TypeVar("Model", bound=Base)
 
 
+class HeadAssignmentStatus(Enum):
+    """Outcome of setting head of a department."""
+
+    ASSIGNED = "assigned"
+    DEPARTMENT_NOT_FOUND = "department_not_found"
+    ALREADY_HAS_HEAD = "already_has_head"
+    NOT_IN_COMPANY = "not_in_company"
+
+
+class HeadAssignment(NamedTuple):
+    """Result of setting head of a department."""
+
+    status: HeadAssignmentStatus
+    department: Optional[Department] = None
+
+
+class DepartmentTreeRow(NamedTuple):
+    """Department of a tree, with optionally loaded head and positions."""
+
+    department: Department
+    head: Optional[User] = None
+    positions: Optional[list[dict]] = None
+
+
+class DepartmentAncestorRow(NamedTuple):
+    """Ancestor of a department, with optionally loaded head."""
+
+    department_id: int
+    ancestor: Department
+    head: Optional[User] = None
+
+
 class DepartmentRepository(SqlAlchemyRepository):
     """
     Repository class for Company model.
@@ -48,17 +101,122 @@ class DepartmentRepository(SqlAlchemyRepository):
         """
         Create a department and return it.
 
+        Department is created by a single INSERT ... SELECT, which builds
+        Ltree path from the parent row and skips the insert on conflict
+        with ``unique_department_name`` or ``unique_path`` constraints.
+
         :param department: object of Department model.
         :return: object of Department model.
+        :raises DepartmentExistsError: if department with such name or
+         path already exists in the company.
+        :raises ParentNotFoundError: if parent department does not exist.
         """
-        path = await self.generate_department_path(department)
-        return await self.add_one_and_get_obj(
-            name=department.name,
-            path=path,
-            parent_department=department.parent_department,
-            company_id=department.company_id,
+        label = department.name.replace(" ", "_")
+        parent = (
+            select(Department.path)
+            .where(Department.id == department.parent_department)
+            .cte("parent")
+        )
+        source: Select
+        parent_found: ColumnElement[bool]
+        if department.parent_department:
+            source = select(
+                literal(department.name),
+                cast(func.concat(parent.c.path, ".", label), LtreeType),
+                literal(department.parent_department),
+                literal(department.company_id),
+            ).select_from(parent)
+            parent_found = exists(select(parent.c.path))
+        else:
+            source = select(
+                literal(department.name),
+                cast(literal(label), LtreeType),
+                literal(None, Integer),
+                literal(department.company_id),
+            )
+            parent_found = true()
+        inserted = (
+            pg_insert(Department)
+            .from_select(
+                ["name", "path", "parent_department", "company_id"],
+                source,
+            )
+            .on_conflict_do_nothing()
+            .returning(*Department.__table__.c)
+            .cte("inserted")
+        )
+        query: Select = (
+            select(
+                aliased(Department, inserted),
+                parent_found,
+                exists().where(
+                    Department.company_id == department.company_id,
+                    Department.name == department.name,
+                ),
+            )
+            .select_from(select(literal(1)).subquery())
+            .outerjoin(inserted, true())
+        )
+        result: Result = await self.session.execute(query)
+        created, has_parent, name_taken = result.one()
+        if created is not None:
+            return created
+        if not name_taken and not has_parent:
+            raise ParentNotFoundError(
+                "Parent department with specified id does not exist.",
+            )
+        raise DepartmentExistsError(
+            "Department with such name already exists",
         )
 
+    async def get_conflicting_departments(
+        self,
+        company_id: int,
+        names: Sequence[str],
+        paths: Sequence[str],
+    ) -> Sequence[tuple[str, str]]:
+        """
+        Find departments of the company, which take given names or paths.
+
+        :param company_id: ID of the company.
+        :param names: names of departments to check.
+        :param paths: Ltree paths of departments to check.
+        :return: names and paths of conflicting departments.
+        """
+        query: Select = select(
+            Department.name,
+            cast(Department.path, String),
+        ).where(
+            Department.company_id == company_id,
+            or_(
+                Department.name == any_(cast(list(names), ARRAY(String))),
+                Department.path
+                == any_(
+                    cast(cast(list(paths), ARRAY(String)), ARRAY(LtreeType)),
+                ),
+            ),
+        )
+        result: Result = await self.session.execute(query)
+        return result.tuples().all()
+
+    async def allocate_ids(self, count: int) -> list[int]:
+        """
+        Reserve IDs for new departments from their sequence.
+
+        Knowing IDs up front allows inserting a whole tree, including
+        references to parent departments, with a single statement.
+
+        :param count: amount of IDs to reserve.
+        :return: reserved IDs.
+        """
+        query: Select = select(
+            func.nextval(
+                func.pg_get_serial_sequence(Department.__tablename__, "id"),
+            ),
+        ).select_from(func.generate_series(1, count))
+        result: ScalarResult = await self.session.scalars(query)
+        return list(result.all())
+
     async def check_department_has_subdepartments(
         self,
         department: Department,
@@ -72,27 +230,176 @@ class DepartmentRepository(SqlAlchemyRepository):
         )
         return await self.session.scalar(query)
 
-    async def get_all_sub_departments(
+    async def get_sub_departments(
         self,
         department_id: int,
-    ) -> Sequence[Department]:
+        company_id: int,
+        limit: int,
+        after: Optional[Ltree] = None,
+    ) -> tuple[Sequence[Department], bool]:
         """
-        Fetch all sub-departments of a given department by its ID.
+        Get a page of sub-departments of a department, ordered by path.
+
+        Paths are unique in a company, so they are used as pagination
+        key, which also keeps every subtree together. Departments of
+        other companies are treated as having no sub-departments.
 
         :param department_id: ID of the department.
-        :return: List of sub-departments.
+        :param company_id: ID of the company of the department.
+        :param limit: maximum amount of sub-departments in the page.
+        :param after: path of the last sub-department of previous page.
+        :return: sub-departments of the page and whether there are more.
         """
-        department = await self.get_by_query_one_or_none(
-            id=department_id,
-        )  # type: ignore[func-returns-value]
-        if department:
-            query: Select = select(Department).where(
-                Department.path.descendant_of(department.path),
-                Department.id != department.id,
+        parent_path = (
+            select(Department.path)
+            .where(
+                Department.id == department_id,
+                Department.company_id == company_id,
+            )
+            .scalar_subquery()
+        )
+        return await self.get_page(
+            limit,
+            after,
+            Department.company_id == company_id,
+            Department.path.descendant_of(parent_path),
+            Department.id != department_id,
+            key=Department.path,
+        )
+
+    async def get_tree(
+        self,
+        company_id: int,
+        root_id: Optional[int] = None,
+        depth: Optional[int] = None,
+        include_heads: bool = False,
+        include_positions: bool = False,
+        limit: Optional[int] = None,
+    ) -> list[DepartmentTreeRow]:
+        """
+        Get departments of a company or of a subtree with a single query.
+
+        Departments are ordered by path, so that every parent precedes
+        its children. Heads are joined, and positions are aggregated
+        into JSON per department, only if requested.
+
+        :param company_id: ID of the company.
+        :param root_id: ID of the root of subtree, whole company if None.
+        :param depth: maximum depth of departments, counting from
+         the root (or from top level departments of the company) as 1.
+        :param include_heads: whether to load heads of departments.
+        :param include_positions: whether to load positions.
+        :param limit: maximum amount of departments to load.
+        :return: departments of the tree.
+        """
+        columns: list = [Department]
+        if include_heads:
+            columns.append(User)
+        if include_positions:
+            columns.append(
+                select(
+                    func.json_agg(
+                        aggregate_order_by(
+                            func.json_build_object(
+                                "id",
+                                Position.id,
+                                "title",
+                                Position.title,
+                                "department_id",
+                                Position.department_id,
+                            ),
+                            Position.id,
+                        ),
+                        type_=JSON,
+                    ),
+                )
+                .where(Position.department_id == Department.id)
+                .scalar_subquery(),
             )
-            result: ScalarResult = await self.session.scalars(query)
-            return result.all()
-        return []
+        query: Select = (
+            select(*columns)
+            .where(Department.company_id == company_id)
+            .order_by(Department.path)
+        )
+        if include_heads:
+            query = query.outerjoin(User, User.id == Department.head_id)
+        root_level: ColumnElement[int] = literal(0)
+        if root_id is not None:
+            root_path = (
+                select(Department.path)
+                .where(
+                    Department.id == root_id,
+                    Department.company_id == company_id,
+                )
+                .scalar_subquery()
+            )
+            query = query.where(Department.path.descendant_of(root_path))
+            root_level = func.nlevel(root_path) - 1
+        if depth is not None:
+            query = query.where(
+                func.nlevel(Department.path) <= root_level + depth,
+            )
+        if limit is not None:
+            query = query.limit(limit)
+        result: Result = await self.session.execute(query)
+        return [
+            DepartmentTreeRow(
+                row[0],
+                row[1] if include_heads else None,
+                (row[-1] or []) if include_positions else None,
+            )
+            for row in result
+        ]
+
+    async def get_ancestors(
+        self,
+        department_ids: Sequence[int],
+        company_id: int,
+        include_heads: bool = False,
+    ) -> list[DepartmentAncestorRow]:
+        """
+        Get ancestors of many departments with a single query.
+
+        Every department is joined with departments, whose paths are
+        ancestors of its path, so a department is an ancestor of itself.
+
+        :param department_ids: IDs of departments.
+        :param company_id: ID of the company, departments of other
+         companies are skipped.
+        :param include_heads: whether to load heads of ancestors.
+        :return: ancestors, grouped by department, from the top level
+         one to the department itself.
+        """
+        target = aliased(Department, name="target")
+        columns: list = [target.id, Department]
+        if include_heads:
+            columns.append(User)
+        query: Select = (
+            select(*columns)
+            .join(
+                Department,
+                and_(
+                    Department.company_id == target.company_id,
+                    Department.path.ancestor_of(target.path),
+                ),
+            )
+            .where(
+                target.id == any_(cast(list(department_ids), ARRAY(Integer))),
+                target.company_id == company_id,
+            )
+            .order_by(target.id, func.nlevel(Department.path))
+        )
+        if include_heads:
+            query = query.outerjoin(User, User.id == Department.head_id)
+        result: Result = await self.session.execute(query)
+        return [
+            DepartmentAncestorRow(
+                row[0],
+                row[1],
+                row[2] if include_heads else None,
+            )
+            for row in result
+        ]
 
     async def check_user_in_requested_department(
         self,
@@ -123,14 +430,64 @@ class DepartmentRepository(SqlAlchemyRepository):
         self,
         user_id: int,
         department_id: int,
-    ) -> Model | None:
-        """Set given user as head of department."""
-        query = select(Department).where(Department.id == department_id)
-        result = await self.session.execute(query)
-        department = result.scalar_one_or_none()
-        if department:
-            return await self.update_one_by_id(department_id, head_id=user_id)
-        return None
+    ) -> HeadAssignment:
+        """
+        Set given user as head of department in a single statement.
+
+        Department is updated only if it has no head yet and the user
+        works in the same company, both conditions are checked by the
+        UPDATE itself, so concurrent requests can't both set a head.
+
+        :param user_id: ID of the new head.
+        :param department_id: ID of the department.
+        :return: outcome of the update, with the updated department.
+        """
+        target = (
+            select(Department.id, Department.head_id, Department.company_id)
+            .where(Department.id == department_id)
+            .cte("target")
+        )
+        candidate = (
+            select(User.id)
+            .join(target, User.company_id == target.c.company_id)
+            .where(User.id == user_id)
+            .cte("candidate")
+        )
+        updated = (
+            update(Department)
+            .where(
+                Department.id == department_id,
+                Department.head_id.is_(None),
+                exists(select(candidate.c.id)),
+            )
+            .values(head_id=user_id)
+            .returning(*Department.__table__.c)
+            .cte("updated")
+        )
+        department = aliased(Department, updated)
+        query: Select = (
+            select(
+                department,
+                target.c.id,
+                target.c.head_id,
+                exists(select(candidate.c.id)),
+            )
+            .select_from(select(literal(1)).subquery())
+            .outerjoin(target, true())
+            .outerjoin(updated, true())
+            .execution_options(populate_existing=True)
+        )
+        result: Result = await self.session.execute(query)
+        updated_department, found_id, head_id, in_company = result.one()
+        if updated_department is not None:
+            status = HeadAssignmentStatus.ASSIGNED
+        elif found_id is None:
+            status = HeadAssignmentStatus.DEPARTMENT_NOT_FOUND
+        elif not in_company and head_id is None:
+            status = HeadAssignmentStatus.NOT_IN_COMPANY
+        else:
+            status = HeadAssignmentStatus.ALREADY_HAS_HEAD
+        return HeadAssignment(status, updated_department)
 
     async def update_department(self, department_id: int, **kwargs) -> Model:
         """Update specified department with new data."""
@@ -1,6 +1,22 @@
-from typing import Any, TYPE_CHECKING, TypeVar, Sequence, Optional
+from collections import Counter
+from collections.abc import AsyncIterator, Collection, Mapping
+from enum import Enum
+from typing import Any, NamedTuple, TYPE_CHECKING, TypeVar, Sequence, Optional
 
-from sqlalchemy import select, exists, insert
+from sqlalchemy import (
+    Integer,
+    and_,
+    case,
+    cast,
+    exists,
+    func,
+    literal,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import aliased
 
 from app.models.company import UserPosition, Department, Position
 from app.repositories.base import SqlAlchemyRepository
@@ -8,11 +24,28 @@ from app.models.base import Base
 from app.models.user import User
 
 if TYPE_CHECKING:
-    from sqlalchemy import Select, Insert, Result
+    from sqlalchemy import FromClause, Select, Result, Update
 
 Model = TypeVar("Model", bound=Base)
 
 
+class AssignmentStatus(Enum):
+    """Outcome of assigning an employee to a position."""
+
+    ASSIGNED = "assigned"
+    POSITION_NOT_FOUND = "position_not_found"
+    NOT_IN_COMPANY = "not_in_company"
+    ALREADY_ASSIGNED = "already_assigned"
+
+
+class PositionAssignment(NamedTuple):
+    """Result of assigning an employee to a position."""
+
+    status: AssignmentStatus
+    position: Optional[Position] = None
+    user_position_id: Optional[int] = None
+
+
 class PositionRepository(SqlAlchemyRepository):
     """
     Repository class for Company model.
@@ -51,17 +84,381 @@ class PositionRepository(SqlAlchemyRepository):
         """Create new position for specified company."""
         return await self.add_one_and_get_obj(**kwargs)
 
-    async def assign_position(self, **kwargs: Any) -> Model:
-        """Assign position to employee."""
-        query: Insert = (
-            insert(UserPosition)
-            .values(**kwargs)
+    def stream_by_company(
+        self,
+        company_id: int,
+        batch_size: int | None = None,
+    ) -> AsyncIterator[Position]:
+        """
+        Stream positions of all departments of the company, ordered by id.
+
+        :param company_id: ID of the company.
+        :param batch_size: amount of rows fetched from server-side
+         cursor at once.
+        :return: async iterator of positions.
+        """
+        query: Select = (
+            select(Position)
+            .join(Department, Department.id == Position.department_id)
+            .where(Department.company_id == company_id)
+            .order_by(Position.id)
+        )
+        return self._stream(query, batch_size)
+
+    async def assign_position(
+        self,
+        user_id: int,
+        position_id: int,
+    ) -> PositionAssignment:
+        """
+        Assign position to employee in a single statement.
+
+        Statement looks up the position, checks that employee is in the
+        company of the position and is not assigned to it yet, and only
+        then inserts the assignment. A concurrent request, which assigned
+        the same pair first, makes the insert a no-op, which is reported
+        as already assigned. Headcounts of the department of the position
+        and of its ancestors are increased by the same statement.
+
+        Before that, the position is locked with FOR KEY SHARE, so that
+        it can't be moved to another department until the assignment is
+        committed, and then the departments to update are locked. Both
+        are separate statements, so that the assignment reads department
+        of the position after a concurrent move is committed.
+
+        :param user_id: ID of the employee.
+        :param position_id: ID of the position.
+        :return: outcome of the assignment, with the position if found.
+        """
+        department_id: Optional[int] = await self.session.scalar(
+            select(Position.department_id)
+            .where(Position.id == position_id)
+            .with_for_update(read=True, key_share=True),
+        )
+        if department_id is None:
+            return PositionAssignment(AssignmentStatus.POSITION_NOT_FOUND)
+        await self._lock_departments([department_id])
+        target = (
+            select(
+                Position.id,
+                Position.title,
+                Position.department_id,
+                Department.company_id,
+            )
+            .join(Department, Department.id == Position.department_id)
+            .where(Position.id == position_id)
+            .cte("target")
+        )
+        member = (
+            select(User.id)
+            .join(target, User.company_id == target.c.company_id)
+            .where(User.id == user_id)
+            .cte("member")
+        )
+        assigned = (
+            select(UserPosition.id)
+            .where(
+                UserPosition.user_id == user_id,
+                UserPosition.position_id == position_id,
+            )
+            .cte("assigned")
+        )
+        inserted = (
+            pg_insert(UserPosition)
+            .from_select(
+                ["user_id", "position_id"],
+                select(member.c.id, literal(position_id, Integer)).where(
+                    ~exists(select(assigned.c.id)),
+                ),
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "position_id"])
+            .returning(UserPosition.id)
+            .cte("inserted")
+        )
+        counted = self._update_headcounts(
+            select(
+                target.c.department_id,
+                literal(1, Integer).label("delta"),
+            )
+            .select_from(inserted)
+            .join(target, true())
+            .subquery("changed"),
+        ).cte("counted")
+        position = aliased(Position, target)
+        query: Select = (
+            select(
+                position,
+                exists(select(member.c.id)).label("is_member"),
+                exists(select(assigned.c.id)).label("is_assigned"),
+                select(inserted.c.id).scalar_subquery(),
+            )
+            .select_from(select(literal(1)).subquery())
+            .outerjoin(target, true())
+            .add_cte(counted)
+        )
+        result: Result = await self.session.execute(query)
+        found, is_member, is_assigned, user_position_id = result.one()
+        if found is None:
+            status = AssignmentStatus.POSITION_NOT_FOUND
+        elif not is_member:
+            status = AssignmentStatus.NOT_IN_COMPANY
+        elif is_assigned or user_position_id is None:
+            status = AssignmentStatus.ALREADY_ASSIGNED
+        else:
+            status = AssignmentStatus.ASSIGNED
+        return PositionAssignment(status, found, user_position_id)
+
+    async def assign_positions(
+        self,
+        pairs: Sequence[tuple[int, int]],
+        company_id: int,
+    ) -> list[PositionAssignment]:
+        """
+        Assign many employees to positions in a single statement.
+
+        Pairs are passed as two arrays and unnested with their ordinal
+        numbers, then company membership and existing assignments are
+        checked for all of them at once, and valid pairs are inserted.
+        A pair, repeated in the batch or assigned by a concurrent request
+        first, is assigned once. Headcounts of departments of inserted
+        assignments and of their ancestors are increased by the same
+        statement. Positions and departments are locked before it, as
+        in ``assign_position``, positions in the order of their IDs.
+
+        :param pairs: user IDs and position IDs to assign.
+        :param company_id: ID of the company, positions of other
+         companies are treated as not found.
+        :return: outcomes of assignments, in the order of ``pairs``.
+        """
+        if not pairs:
+            return []
+        user_ids, position_ids = zip(*pairs, strict=True)
+        locked: Result = await self.session.execute(
+            select(Position.department_id)
+            .join(Department, Department.id == Position.department_id)
+            .where(
+                Position.id.in_(set(position_ids)),
+                Department.company_id == company_id,
+            )
+            .order_by(Position.id)
+            .with_for_update(of=Position, read=True, key_share=True),
+        )
+        await self._lock_departments(set(locked.scalars()))
+        unnested = (
+            func.unnest(
+                cast(list(user_ids), ARRAY(Integer)),
+                cast(list(position_ids), ARRAY(Integer)),
+            )
+            .table_valued("user_id", "position_id", with_ordinality="ord")
+            .render_derived()
+        )
+        requested = select(
+            unnested.c.ord,
+            unnested.c.user_id,
+            unnested.c.position_id,
+            func.row_number()
+            .over(
+                partition_by=(unnested.c.user_id, unnested.c.position_id),
+                order_by=unnested.c.ord,
+            )
+            .label("occurrence"),
+        ).cte("requested")
+        target = (
+            select(Position.id, Department.company_id)
+            .join(Department, Department.id == Position.department_id)
+            .where(Department.company_id == company_id)
+            .subquery("target")
+        )
+        checked = (
+            select(
+                requested,
+                target.c.id.label("found_id"),
+                User.id.label("member_id"),
+                exists()
+                .where(
+                    UserPosition.user_id == requested.c.user_id,
+                    UserPosition.position_id == requested.c.position_id,
+                )
+                .label("is_assigned"),
+            )
+            .outerjoin(target, target.c.id == requested.c.position_id)
+            .outerjoin(
+                User,
+                and_(
+                    User.id == requested.c.user_id,
+                    User.company_id == target.c.company_id,
+                ),
+            )
+            .cte("checked")
+        )
+        inserted = (
+            pg_insert(UserPosition)
+            .from_select(
+                ["user_id", "position_id"],
+                select(checked.c.user_id, checked.c.position_id).where(
+                    checked.c.found_id.is_not(None),
+                    checked.c.member_id.is_not(None),
+                    ~checked.c.is_assigned,
+                    checked.c.occurrence == 1,
+                ),
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "position_id"])
             .returning(
-                UserPosition,
+                UserPosition.id,
+                UserPosition.user_id,
+                UserPosition.position_id,
+            )
+            .cte("inserted")
+        )
+        counted = self._update_headcounts(
+            select(
+                Position.department_id,
+                func.count().label("delta"),
+            )
+            .join(inserted, inserted.c.position_id == Position.id)
+            .group_by(Position.department_id)
+            .subquery("changed"),
+        ).cte("counted")
+        query: Select = (
+            select(
+                Position,
+                checked.c.member_id,
+                checked.c.is_assigned,
+                checked.c.occurrence,
+                inserted.c.id,
+            )
+            .select_from(checked)
+            .outerjoin(Position, Position.id == checked.c.found_id)
+            .outerjoin(
+                inserted,
+                and_(
+                    inserted.c.user_id == checked.c.user_id,
+                    inserted.c.position_id == checked.c.position_id,
+                    checked.c.occurrence == 1,
+                ),
+            )
+            .order_by(checked.c.ord)
+            .add_cte(counted)
+        )
+        result: Result = await self.session.execute(query)
+        assignments: list[PositionAssignment] = []
+        for found, member_id, is_assigned, occurrence, inserted_id in result:
+            if found is None:
+                status = AssignmentStatus.POSITION_NOT_FOUND
+            elif member_id is None:
+                status = AssignmentStatus.NOT_IN_COMPANY
+            elif is_assigned or occurrence > 1 or inserted_id is None:
+                status = AssignmentStatus.ALREADY_ASSIGNED
+            else:
+                status = AssignmentStatus.ASSIGNED
+            assignments.append(PositionAssignment(status, found, inserted_id))
+        return assignments
+
+    async def _change_headcounts(self, deltas: Mapping[int, int]) -> None:
+        """
+        Change headcounts of departments and of all their ancestors.
+
+        :param deltas: change of amount of assignments, by department ID.
+        """
+        deltas = {key: value for key, value in deltas.items() if value}
+        if not deltas:
+            return
+        await self._lock_departments(deltas)
+        changed = (
+            func.unnest(
+                cast(list(deltas), ARRAY(Integer)),
+                cast(list(deltas.values()), ARRAY(Integer)),
+            )
+            .table_valued("department_id", "delta")
+            .render_derived()
+        )
+        await self.session.execute(self._update_headcounts(changed))
+
+    @staticmethod
+    def _update_headcounts(changed: "FromClause") -> "Update":
+        """
+        Build statement, changing headcounts of departments and ancestors.
+
+        All departments are updated at once, an ancestor of several
+        changed departments gets the sum of their changes. Statement can
+        be used as a data-modifying CTE of a bigger one. Departments must
+        be locked by ``_lock_departments`` before, by a separate
+        statement.
+
+        :param changed: rows of ``department_id`` and ``delta``, change of
+         amount of assignments of the department.
+        :return: UPDATE statement, returning IDs of updated departments.
+        """
+        source = aliased(Department, name="source")
+        ancestor = aliased(Department, name="ancestor")
+        totals = (
+            select(
+                ancestor.id,
+                func.sum(
+                    case(
+                        (ancestor.id == source.id, changed.c.delta),
+                        else_=0,
+                    ),
+                ).label("direct"),
+                func.sum(changed.c.delta).label("subtree"),
+            )
+            .select_from(changed)
+            .join(source, source.id == changed.c.department_id)
+            .join(
+                ancestor,
+                and_(
+                    ancestor.company_id == source.company_id,
+                    ancestor.path.ancestor_of(source.path),
+                ),
             )
+            .group_by(ancestor.id)
+            .subquery("totals")
+        )
+        return (
+            update(Department)
+            .where(Department.id == totals.c.id)
+            .values(
+                headcount=Department.headcount + totals.c.direct,
+                subtree_headcount=(
+                    Department.subtree_headcount + totals.c.subtree
+                ),
+            )
+            .returning(Department.id)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _lock_departments(self, department_ids: Collection[int]) -> None:
+        """
+        Lock departments and all their ancestors in the order of their IDs.
+
+        Statements, changing headcounts of overlapping sets of ancestors,
+        wait for each other instead of deadlocking. Locks are taken by a
+        separate top-level statement, as the order of rows, locked by a
+        subquery, is not guaranteed.
+
+        :param department_ids: IDs of departments.
+        """
+        if not department_ids:
+            return
+        source = aliased(Department, name="source")
+        ancestor = aliased(Department, name="ancestor")
+        ancestors = (
+            select(ancestor.id)
+            .join(
+                source,
+                and_(
+                    source.company_id == ancestor.company_id,
+                    ancestor.path.ancestor_of(source.path),
+                ),
+            )
+            .where(source.id.in_(list(department_ids)))
+        )
+        await self.session.execute(
+            select(Department.id)
+            .where(Department.id.in_(ancestors))
+            .order_by(Department.id)
+            .with_for_update(key_share=True),
         )
-        obj: Result = await self.session.execute(query)
-        return obj.scalar_one()
 
     async def get_user_position(self, user_id: int) -> Sequence[Model]:
         """Fetch specified user position."""
@@ -99,8 +496,42 @@ class PositionRepository(SqlAlchemyRepository):
         position_id: int,
         **kwargs: Any,
     ) -> Optional[Model]:
-        """Update position data for specified company."""
-        return await self.update_one_by_id(position_id, **kwargs)
+        """
+        Update position data for specified company.
+
+        When the position is moved to another department, its assignments
+        are moved between headcounts of both departments and of their
+        ancestors. The position is locked with FOR UPDATE, which waits
+        for assignments, holding FOR KEY SHARE on it, to be committed,
+        and makes new ones wait for the move.
+        """
+        if "department_id" not in kwargs:
+            return await self.update_one_by_id(position_id, **kwargs)
+        old_department_id: Optional[int] = await self.session.scalar(
+            select(Position.department_id)
+            .where(Position.id == position_id)
+            .with_for_update(),
+        )
+        # Counted by a separate statement, so that its snapshot is taken
+        # after the lock and includes assignments committed meanwhile.
+        counted: Result = await self.session.execute(
+            select(func.count()).where(
+                UserPosition.position_id == position_id,
+            ),
+        )
+        employees: int = counted.scalar_one()
+        position: Optional[Position] = await self.update_one_by_id(
+            position_id,
+            **kwargs,
+        )
+        if position is not None:
+            deltas: Counter[int] = Counter()
+            if old_department_id is not None:
+                deltas[old_department_id] -= employees
+            if position.department_id is not None:
+                deltas[position.department_id] += employees
+            await self._change_headcounts(deltas)
+        return position
 
     async def delete_position(self, position_id: int) -> None:
         """Delete position for specified company."""
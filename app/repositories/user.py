@@ -1,11 +1,13 @@
+from collections.abc import Sequence
 from typing import Any, TYPE_CHECKING, TypeVar
 
-from sqlalchemy import select, exists
+from sqlalchemy import String, any_, cast, exists, select
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from app.repositories.base import SqlAlchemyRepository
 from app.models.base import Base
 from app.models.user import User, Role
-from app.utils.auth import hash_password
+from app.utils.auth import hash_password_async
 
 Model = TypeVar("Model", bound=Base)
 
@@ -36,7 +38,7 @@ class UserRepository(SqlAlchemyRepository):
             first_name=kwargs.get("first_name"),
             last_name=kwargs.get("last_name"),
             account=kwargs.get("account"),
-            password=hash_password(password).decode("utf-8"),
+            password=(await hash_password_async(password)).decode("utf-8"),
             company_id=kwargs.get("company_id"),
         )
         return await self.add_one_and_get_obj(**user_data)
@@ -51,6 +53,18 @@ class UserRepository(SqlAlchemyRepository):
         query: Select = select(exists().where(User.account == email))
         return await self.session.scalar(query)
 
+    async def get_existing_accounts(self, accounts: Sequence[str]) -> set[str]:
+        """
+        Get accounts, which are already taken, out of given ones.
+
+        :param accounts: accounts to check.
+        :return: set of taken accounts.
+        """
+        query: Select = select(User.account).where(
+            User.account == any_(cast(list(accounts), ARRAY(String))),
+        )
+        return set(await self.session.scalars(query))
+
     async def check_user_is_admin_in_org(self, user: User) -> bool:
         """
         Check if user is admin in organization.
@@ -1,6 +1,8 @@
 from typing import Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from app.schemas.position import PositionOut
 
 
 class DepartmentIn(BaseModel):
@@ -20,6 +22,28 @@ class DepartmentOut(DepartmentIn):
     head_id: Optional[int] = None
 
 
+class DepartmentHeadcountOut(BaseModel):
+    """
+    Schema for headcount of department, used in responses.
+
+    Headcounts are amounts of position assignments, not of distinct
+    employees: an employee, holding two positions, is counted twice.
+    ``subtree_headcount`` includes assignments of all sub-departments.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    headcount: int = Field(
+        description="Amount of position assignments in the department",
+    )
+    subtree_headcount: int = Field(
+        description=(
+            "Amount of position assignments in the department and in all"
+            " its sub-departments"
+        ),
+    )
+
+
 class DepartmentHead(BaseModel):
     """Schema for setting department head."""
 
@@ -31,3 +55,100 @@ class DepartmentUpdate(BaseModel):
     """Schema for updating department."""
 
     name: Optional[str] = None
+
+
+class DepartmentTreeNode(BaseModel):
+    """Schema for department of nested org chart import."""
+
+    name: str = Field(..., min_length=1)
+    positions: list[str] = Field(default_factory=list)
+    children: list["DepartmentTreeNode"] = Field(default_factory=list)
+
+
+class DepartmentListNode(BaseModel):
+    """
+    Schema for department of adjacency list org chart import.
+
+    Parent is referenced by its name, as names are unique in a company.
+    """
+
+    name: str = Field(..., min_length=1)
+    parent: Optional[str] = None
+    positions: list[str] = Field(default_factory=list)
+
+
+class OrgChartImport(BaseModel):
+    """
+    Schema for bulk import of departments.
+
+    Exactly one of ``tree`` or ``departments`` must be given. Top level
+    departments are attached to ``parent_department``, if it is set.
+    """
+
+    parent_department: Optional[int] = None
+    tree: Optional[list[DepartmentTreeNode]] = None
+    departments: Optional[list[DepartmentListNode]] = None
+
+    @model_validator(mode="after")
+    def check_single_form(self) -> "OrgChartImport":
+        """Check that org chart is given in exactly one form."""
+        if (self.tree is None) == (self.departments is None):
+            raise ValueError(
+                "Either 'tree' or 'departments' must be provided",
+            )
+        return self
+
+
+class OrgChartOut(BaseModel):
+    """Schema for result of org chart import, used in responses."""
+
+    departments: list[DepartmentOut]
+    positions: list[PositionOut]
+
+
+class DepartmentHeadOut(BaseModel):
+    """Schema for head of department, used in department tree."""
+
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    first_name: str
+    last_name: str
+    account: str
+
+
+class DepartmentTreeOut(BaseModel):
+    """
+    Schema for department with its sub-departments, used in responses.
+
+    ``head`` and ``positions`` are only set, if they were requested.
+    """
+
+    id: int
+    name: str
+    path: str
+    parent_department: Optional[int] = None
+    head_id: Optional[int] = None
+    head: Optional[DepartmentHeadOut] = None
+    positions: Optional[list[PositionOut]] = None
+    children: list["DepartmentTreeOut"] = Field(default_factory=list)
+
+
+class DepartmentCrumbOut(DepartmentOut):
+    """
+    Schema for department in a breadcrumb, used in responses.
+
+    ``head`` is only set, if it was requested.
+    """
+
+    head: Optional[DepartmentHeadOut] = None
+
+
+class DepartmentBreadcrumb(BaseModel):
+    """
+    Schema for chain of ancestors of a department, used in responses.
+
+    Ancestors go from the top level department to the department itself.
+    """
+
+    department_id: int
+    ancestors: list[DepartmentCrumbOut]
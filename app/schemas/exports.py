@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class ExportFormat(Enum):
+    """Enum, which represents supported formats of bulk exports."""
+
+    CSV = "csv"
+    JSONL = "jsonl"
@@ -0,0 +1,34 @@
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+
+class ImportFormat(Enum):
+    """Enum, which represents supported formats of bulk imports."""
+
+    CSV = "csv"
+    JSONL = "jsonl"
+
+
+class ImportRowError(BaseModel):
+    """
+    Schema for a row, which was not imported.
+
+    Used in import reports.
+    """
+
+    line: int
+    account: str | None = None
+    errors: list[str]
+
+
+class ImportReport(BaseModel):
+    """
+    Schema for result of bulk import.
+
+    Used in response.
+    """
+
+    total: int = 0
+    created: int = 0
+    errors: list[ImportRowError] = Field(default_factory=list)
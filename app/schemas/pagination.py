@@ -0,0 +1,17 @@
+from typing import Generic, Optional, TypeVar
+
+from pydantic import BaseModel
+
+Item = TypeVar("Item")
+
+
+class Page(BaseModel, Generic[Item]):
+    """
+    Schema for a page of list endpoint.
+
+    ``next_cursor`` is passed as ``cursor`` to get the next page, it is
+    None on the last page.
+    """
+
+    items: list[Item]
+    next_cursor: Optional[str] = None
@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -46,3 +46,18 @@ class UserPositionOut(BaseModel):
     id: int
     user_id: int
     position: PositionOut
+
+
+class UserPositionResult(BaseModel):
+    """
+    Schema for outcome of assigning employee to a position in a batch.
+
+    ``status`` is one of ``assigned``, ``position_not_found``,
+    ``not_in_company`` or ``already_assigned``.
+    """
+
+    user_id: int
+    position_id: int
+    status: str
+    id: Optional[int] = None
+    position: Optional[PositionOut] = None
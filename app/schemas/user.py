@@ -16,6 +16,7 @@ class UserOut(BaseModel):
     last_name: str
     account: EmailStr
     role: Role
+    company_id: int
 
 
 class UserIn(UserOut):
@@ -60,3 +61,16 @@ class UserCredentials(BaseModel):
 
     first_name: str
     last_name: str
+
+
+class EmployeeImportRow(BaseModel):
+    """
+    Schema for a row of bulk employee import.
+
+    Fields follow the same rules as the ones used on company sign up.
+    """
+
+    account: EmailStr
+    password: str
+    first_name: str
+    last_name: str
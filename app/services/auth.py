@@ -1,3 +1,4 @@
+import time
 from http import HTTPStatus
 
 from fastapi.exceptions import HTTPException
@@ -6,7 +7,9 @@ from app.models.user import User
 from app.services.base import BaseService, atomic
 from app.schemas.auth import AccessToken
 from app.schemas.user import UserOut
-from app.utils.auth import verify_password
+from app.core.config import settings
+from app.utils.auth import principals, verify_password_async
+from app.utils.exceptions import PasswordHashingOverloadedError
 
 
 class AuthService(BaseService):
@@ -34,10 +37,17 @@ class AuthService(BaseService):
         )
         if not (user := await self.get_by_query_one_or_none(account=account)):
             raise invalid_user_exception
-        if not verify_password(
-            password,
-            bytes(user.password, encoding="utf-8"),
-        ):
+        try:
+            is_valid = await verify_password_async(
+                password,
+                bytes(user.password, encoding="utf-8"),
+            )
+        except PasswordHashingOverloadedError as exception:
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail=str(exception),
+            )
+        if not is_valid:
             raise invalid_user_exception
         return user
 
@@ -52,7 +62,7 @@ class AuthService(BaseService):
         token = await self.uow.auth.issue_jwt(user)
         return AccessToken(access_token=token)
 
-    @atomic
+    @atomic(read_only=True)
     async def decode_token(self, token: str) -> dict:
         """
         Decode JWT token into string.
@@ -69,23 +79,55 @@ class AuthService(BaseService):
             )
         return payload
 
-    @atomic
     async def get_current_auth_user(self, payload: dict) -> UserOut:
         """
         Try to get current user from token.
 
+        Users are looked up in the per-worker principal cache by the id
+        carried in the token, so that database is only queried on cache
+        misses. Token is rejected if it carries no id, or if account in
+        it doesn't match the current account of the user with that id,
+        so that a token, issued before the account was changed, can't
+        authenticate a user, who has taken that account since.
+
         :param payload: token payload.
         :return: current user.
         """
+        user_id: int | None = payload.get("user_id")
         user_account: str | None = payload.get("account")
-        if not (
-            user := await self.uow.auth.get_by_query_one_or_none(
-                # type: ignore[func-returns-value]
-                account=user_account,
-            )
-        ):
+        user: UserOut | None = None
+        if user_id is not None:
+            user = principals.get(user_id)
+            if user is None:
+                user = await self.load_principal(user_id)
+        if user is None or user.id != user_id or user.account != user_account:
             raise HTTPException(
                 status_code=HTTPStatus.UNAUTHORIZED,
                 detail="Invalid token data",
             )
-        return UserOut.model_validate(user)
+        return user
+
+    @atomic(read_only=True)
+    async def load_principal(self, user_id: int) -> UserOut | None:
+        """
+        Load user by id from the database and cache it.
+
+        Runs in a read-only block, so that a cache miss doesn't open a
+        writing transaction, which the rest of the request would inherit.
+
+        :param user_id: ID of the user.
+        :return: user, or None if not found.
+        """
+        user: User | None = await self.uow.auth.get_by_query_one_or_none(
+            id=user_id,
+        )
+        if user is None:
+            return None
+        principal = UserOut.model_validate(user)
+        principals.set(
+            principal.id,
+            principal,
+            expires_at=time.time()
+            + settings.auth_jwt.principals_cache_ttl_seconds,
+        )
+        return principal
@@ -1,7 +1,9 @@
-from collections.abc import Sequence
+from collections.abc import AsyncIterator
 from typing import Any
 
-from app.units_of_work.base import atomic, UnitOfWork
+from fastapi import Depends
+
+from app.units_of_work.base import atomic, get_unit_of_work, UnitOfWork
 
 
 class BaseService:
@@ -14,9 +16,14 @@ class BaseService:
 
     base_repository: str
 
-    def __init__(self) -> None:
-        """Apply Unit of Work to service."""
-        self.uow: UnitOfWork = UnitOfWork()
+    def __init__(self, uow: UnitOfWork = Depends(get_unit_of_work)) -> None:
+        """
+        Apply Unit of Work to service.
+
+        When used as a dependency, all services of a request share the
+        same request-scoped Unit of Work.
+        """
+        self.uow: UnitOfWork = uow
 
     @atomic
     async def add_one(self, **kwargs: Any) -> None:
@@ -47,7 +54,7 @@ class BaseService:
             self.base_repository,
         ).add_one_and_get_obj(**kwargs)
 
-    @atomic
+    @atomic(read_only=True)
     async def get_by_query_one_or_none(self, **kwargs: Any) -> Any:
         """
         Get an object from the database via unit of work.
@@ -59,17 +66,6 @@ class BaseService:
             self.base_repository,
         ).get_by_query_one_or_none(**kwargs)
 
-    @atomic
-    async def get_by_query_all(self, **kwargs: Any) -> Sequence[Any]:
-        """
-        Get sequence of objects from the database via unit of work.
-
-        After that, return them (if found).
-        """
-        return await getattr(self.uow, self.base_repository).get_by_query_all(
-            **kwargs,
-        )
-
     @atomic
     async def update_one_by_id(self, obj_id: int | str, **kwargs: Any) -> Any:
         """
@@ -91,3 +87,22 @@ class BaseService:
     async def delete_all(self) -> None:
         """Delete all objects from the database via unit of work."""
         await getattr(self.uow, self.base_repository).delete_all()
+
+    async def _stream(
+        self,
+        method: str,
+        *args: Any,
+        **kwargs: Any,
+    ) -> AsyncIterator[Any]:
+        """
+        Stream objects from a streaming method of the base repository.
+
+        Streaming responses are sent after the request-scoped Unit of
+        Work is closed, so a dedicated one is opened for the stream, and
+        all rows are read from a single consistent snapshot.
+        """
+        uow = UnitOfWork()
+        async with uow.read_only(snapshot=True):
+            repository = getattr(uow, self.base_repository)
+            async for obj in getattr(repository, method)(*args, **kwargs):
+                yield obj
@@ -2,11 +2,13 @@ from http import HTTPStatus
 from typing import TYPE_CHECKING
 
 from fastapi.exceptions import HTTPException
-from email_validator import validate_email, EmailNotValidError
+from email_validator import EmailNotValidError
 
 from app.models.auth import InviteChallenge
 from app.schemas.company import CompanyOut, SignUpStatus
 from app.services.base import BaseService, atomic
+from app.utils.email import validate_email_async
+from app.utils.exceptions import PasswordHashingOverloadedError
 
 if TYPE_CHECKING:
     from app.models.company import Company
@@ -21,17 +23,7 @@ class CompanyService(BaseService):
 
     base_repository: str = "companies"
 
-    @atomic
-    async def generate_invite_token(self, account: str) -> InviteChallenge:
-        """
-        Generate invite token for company with given email.
-
-        :param account: email of the company.
-        :return: object of InviteChallenge model.
-        """
-        return await self.uow.companies.generate_invite_code(account)
-
-    @atomic
+    @atomic(read_only=True)
     async def check_token_exists(self, account: str) -> bool:
         """
         Check if token was already created for given email.
@@ -46,6 +38,9 @@ class CompanyService(BaseService):
         """
         Verify if token-email pair is valid.
 
+        Invite is read from the primary, not from a replica, as it is
+        usually issued right before it is verified.
+
         :param account: incoming email.
         :param invite_token: incoming invite token.
         :return: True if token-email pair is valid, False otherwise.
@@ -61,7 +56,13 @@ class CompanyService(BaseService):
         :return: created company in CompanyOut schema.
         """
         company: Company = await self.uow.companies.create_company(**kwargs)
-        await self.uow.users.create_user(company_id=company.id, **kwargs)
+        try:
+            await self.uow.users.create_user(company_id=company.id, **kwargs)
+        except PasswordHashingOverloadedError as exception:
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail=str(exception),
+            )
         return CompanyOut.model_validate(company)
 
     @atomic
@@ -75,23 +76,24 @@ class CompanyService(BaseService):
         :return: object of InviteChallenge model.
         """
         try:
-            validate_email(account)
+            await validate_email_async(account)
         except EmailNotValidError:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail="Email is not valid",
             )
-        if await self.uow.users.check_account_exists(account):
+        issue = await self.uow.companies.issue_invite(account)
+        if issue.account_taken:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail="Email already taken",
             )
-        if await self.check_token_exists(account):
+        if issue.invite is None:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail="Invite token for that email already exists",
             )
-        return await self.generate_invite_token(account)
+        return issue.invite
 
     @atomic
     async def sign_up(self, body: dict[str, str]) -> SignUpStatus:
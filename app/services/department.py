@@ -1,15 +1,165 @@
+import re
+from collections import deque
+from collections.abc import AsyncIterator, Sequence
+from functools import partial
 from http import HTTPStatus
+from typing import NamedTuple, Optional
 
 from fastapi.exceptions import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy_utils import Ltree
 
-from app.models.company import Department
+from app.models.company import Department, Position
+from app.core.config import settings
+from app.models.user import Role, User
+from app.repositories.department import HeadAssignmentStatus
 from app.schemas.department import (
+    DepartmentBreadcrumb,
+    DepartmentCrumbOut,
+    DepartmentHeadcountOut,
     DepartmentOut,
     DepartmentHead,
+    DepartmentHeadOut,
+    DepartmentListNode,
+    DepartmentTreeNode,
+    DepartmentTreeOut,
     DepartmentUpdate,
+    OrgChartImport,
+    OrgChartOut,
 )
+from app.schemas.exports import ExportFormat
+from app.schemas.pagination import Page
+from app.schemas.position import PositionOut
+from app.schemas.user import UserOut
 from app.services.base import BaseService, atomic
-from app.utils.exceptions import ParentNotFoundError
+from app.utils.exceptions import (
+    DepartmentExistsError,
+    InvalidCursorError,
+    ParentNotFoundError,
+)
+from app.utils.department_cache import (
+    invalidate_company,
+    is_version_behind,
+    set_company_version,
+    sub_departments,
+)
+from app.utils.exports import encode_rows
+from app.utils.pagination import clamp_limit, decode_cursor, encode_cursor
+
+
+class _ImportedDepartment(NamedTuple):
+    """Department of org chart import, flattened from its input form."""
+
+    name: str
+    parent: Optional[str]
+    positions: list[str]
+
+
+def _flatten_org_chart(
+    chart: OrgChartImport,
+    errors: list[str],
+) -> list[_ImportedDepartment]:
+    """
+    Flatten org chart into a list, where parents precede children.
+
+    Problems of the chart itself are appended to ``errors``.
+    """
+    if chart.tree is not None:
+        return _flatten_tree(chart.tree)
+    return _flatten_list(chart.departments or [], errors)
+
+
+def _flatten_tree(
+    tree: list[DepartmentTreeNode],
+) -> list[_ImportedDepartment]:
+    """Flatten nested org chart, breadth first."""
+    flat: list[_ImportedDepartment] = []
+    queue: deque[tuple[DepartmentTreeNode, Optional[str]]] = deque(
+        (node, None) for node in tree
+    )
+    while queue:
+        node, parent = queue.popleft()
+        flat.append(_ImportedDepartment(node.name, parent, node.positions))
+        queue.extend((child, node.name) for child in node.children)
+    return flat
+
+
+def _flatten_list(
+    nodes: list[DepartmentListNode],
+    errors: list[str],
+) -> list[_ImportedDepartment]:
+    """Flatten adjacency list org chart, breadth first from its roots."""
+    children: dict[Optional[str], list[DepartmentListNode]] = {}
+    names = {node.name for node in nodes}
+    for node in nodes:
+        if node.parent is not None and node.parent not in names:
+            errors.append(
+                f"Parent '{node.parent}' of department '{node.name}'"
+                " is not in the import",
+            )
+        children.setdefault(node.parent, []).append(node)
+    flat: list[_ImportedDepartment] = []
+    queue: deque[DepartmentListNode] = deque(children.get(None, []))
+    while queue:
+        node = queue.popleft()
+        flat.append(
+            _ImportedDepartment(node.name, node.parent, node.positions),
+        )
+        queue.extend(children.pop(node.name, []))
+    if len(flat) < len(nodes) and not errors:
+        errors.append("Departments must not form a cycle")
+    return flat
+
+
+# Labels, accepted by ltree: alphanumeric characters and underscores in
+# C locale, shorter than 256 bytes.
+LTREE_LABEL = re.compile(r"[A-Za-z0-9_]{1,255}")
+
+
+def _compute_paths(
+    departments: list[_ImportedDepartment],
+    base_path: Optional[str],
+    errors: list[str],
+) -> dict[str, str]:
+    """
+    Compute Ltree paths of imported departments, mapped by their names.
+
+    Names, which don't make valid Ltree labels, repeated names and
+    paths, as well as repeated positions, are appended to ``errors``.
+    """
+    paths: dict[str, str] = {}
+    names_by_path: dict[str, str] = {}
+    for department in departments:
+        if department.name in paths:
+            errors.append(
+                f"Department '{department.name}' is repeated in the import",
+            )
+            continue
+        parent_path = (
+            paths.get(department.parent)
+            if department.parent is not None
+            else base_path
+        )
+        label = department.name.replace(" ", "_")
+        if not LTREE_LABEL.fullmatch(label):
+            errors.append(
+                f"Department name '{department.name}' may only contain"
+                " latin letters, digits, underscores and spaces, and be"
+                " shorter than 256 characters",
+            )
+        path = f"{parent_path}.{label}" if parent_path else label
+        if path in names_by_path:
+            errors.append(
+                f"Departments '{names_by_path[path]}' and"
+                f" '{department.name}' have the same path '{path}'",
+            )
+        paths[department.name] = path
+        names_by_path[path] = department.name
+        if len(set(department.positions)) < len(department.positions):
+            errors.append(
+                f"Positions of department '{department.name}' are repeated",
+            )
+    return paths
 
 
 class DepartmentService(BaseService):
@@ -43,7 +193,7 @@ class DepartmentService(BaseService):
             ),
         )
 
-    @atomic
+    @atomic(read_only=True)
     async def check_user_in_requested_department(
         self,
         user_id: int,
@@ -55,14 +205,14 @@ class DepartmentService(BaseService):
             department_id,
         )
 
-    @atomic
+    @atomic(read_only=True)
     async def check_department_has_head(self, department_id: int) -> bool:
         """Check if requested department has head."""
         return await self.uow.departments.check_department_has_head(
             department_id,
         )
 
-    @atomic
+    @atomic(read_only=True)
     async def check_department_has_subdepartments(
         self,
         department: Department,
@@ -78,65 +228,289 @@ class DepartmentService(BaseService):
         department: Department,
     ) -> DepartmentOut:
         """Create new department for specified company."""
-        if await self.get_by_query_one_or_none(
-            name=department.name,
-            company_id=department.company_id,
-        ):
-            raise HTTPException(
-                status_code=HTTPStatus.BAD_REQUEST,
-                detail="Department with such name already exists",
-            )
         try:
             department = await self.uow.departments.create_department(
                 department,
             )
+            await self._departments_changed(department.company_id)
             return self.validate_incoming_department(department)
-        except ParentNotFoundError as exception:
+        except (DepartmentExistsError, ParentNotFoundError) as exception:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail=str(exception),
             )
 
-    @atomic
-    async def get_all_sub_departments(
+    @atomic(read_only=True)
+    async def get_headcount(
         self,
+        user: User,
         department_id: int,
-    ) -> list[DepartmentOut]:
-        """Get all sub-departments of a department for specified company."""
-        departments = await self.uow.departments.get_all_sub_departments(
+    ) -> DepartmentHeadcountOut:
+        """
+        Get stored headcount of a department of user's company.
+
+        :param user: request user.
+        :param department_id: ID of the department.
+        :return: headcount of the department and of its subtree.
+        """
+        department: Optional[Department]
+        department = await self.uow.departments.get_by_query_one_or_none(
+            id=department_id,
+            company_id=user.company_id,
+        )
+        if department is None:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail="Department not found",
+            )
+        return DepartmentHeadcountOut.model_validate(department)
+
+    @atomic(read_only=True)
+    async def get_sub_departments(
+        self,
+        user: User,
+        department_id: int,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Page[DepartmentOut]:
+        """
+        Get a page of sub-departments of a department of user's company.
+
+        Pages are cached per version of departments of the company. The
+        version and, on a miss, the page are read from the read-only
+        engine. If it lags behind a version, which this worker has
+        already seen, e.g. right after this worker changed departments,
+        both are read from the primary instead.
+
+        :param user: request user.
+        :param department_id: ID of the department.
+        :param limit: maximum amount of sub-departments in the page.
+        :param cursor: cursor of the page, returned with previous one.
+        :return: page of sub-departments.
+        """
+        try:
+            after = decode_cursor("path", cursor)
+            after_path = Ltree(after) if after is not None else None
+        except (InvalidCursorError, TypeError, ValueError):
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="Cursor is not valid",
+            )
+        limit = clamp_limit(limit)
+        version = await self.uow.companies.get_departments_version(
+            user.company_id,
+        )
+        if not is_version_behind(user.company_id, version):
+            return await self._get_sub_departments_page(
+                user.company_id,
+                version,
+                department_id,
+                limit,
+                after_path,
+            )
+        async with self.uow.read_only(primary=True):
+            version = await self.uow.companies.get_departments_version(
+                user.company_id,
+            )
+            return await self._get_sub_departments_page(
+                user.company_id,
+                version,
+                department_id,
+                limit,
+                after_path,
+            )
+
+    async def _get_sub_departments_page(
+        self,
+        company_id: int,
+        version: int,
+        department_id: int,
+        limit: int,
+        after_path: Optional[Ltree],
+    ) -> Page[DepartmentOut]:
+        """
+        Get a page of sub-departments from the cache or the database.
+
+        A page, read under a version older than already seen one, is
+        returned, but not cached.
+        """
+        after = str(after_path) if after_path is not None else None
+        key = (company_id, version, department_id, limit, after)
+        if (page := sub_departments.get(key)) is not None:
+            return page
+        departments, has_more = await self.uow.departments.get_sub_departments(
             department_id,
+            company_id,
+            limit,
+            after_path,
+        )
+        page = Page(
+            items=[
+                self.validate_incoming_department(department)
+                for department in departments
+            ],
+            next_cursor=(
+                encode_cursor("path", str(departments[-1].path))
+                if has_more
+                else None
+            ),
+        )
+        if set_company_version(company_id, version):
+            sub_departments.set(key, page, weight=len(departments) + 1)
+        return page
+
+    @atomic(read_only=True)
+    async def get_tree(
+        self,
+        user: User,
+        root_id: Optional[int] = None,
+        depth: Optional[int] = None,
+        include_heads: bool = False,
+        include_positions: bool = False,
+    ) -> list[DepartmentTreeOut]:
+        """
+        Get nested tree of departments of user's company or of a subtree.
+
+        Departments are loaded with one query ordered by path, so the
+        tree is assembled in a single pass: every parent is already
+        seen when its children come. Trees larger than configured
+        maximum are rejected, they have to be narrowed with ``root_id``
+        and ``depth`` or paged through sub-departments.
+
+        :param user: request user.
+        :param root_id: ID of the root of subtree, whole company if None.
+        :param depth: maximum depth of the tree.
+        :param include_heads: whether to include heads of departments.
+        :param include_positions: whether to include positions.
+        :return: top level departments, or the root of the subtree,
+         with their descendants.
+        """
+        rows = await self.uow.departments.get_tree(
+            user.company_id,
+            root_id,
+            depth,
+            include_heads,
+            include_positions,
+            settings.pagination.max_tree_size + 1,
+        )
+        if len(rows) > settings.pagination.max_tree_size:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=(
+                    "Tree has more than"
+                    f" {settings.pagination.max_tree_size} departments,"
+                    " narrow it with root_id and depth"
+                ),
+            )
+        if root_id is not None and not rows:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail="Department not found",
+            )
+        nodes: dict[int, DepartmentTreeOut] = {}
+        roots: list[DepartmentTreeOut] = []
+        for department, head, positions in rows:
+            node = DepartmentTreeOut(
+                id=department.id,
+                name=department.name,
+                path=str(department.path),
+                parent_department=department.parent_department,
+                head_id=department.head_id,
+                head=(
+                    DepartmentHeadOut.model_validate(head)
+                    if head is not None
+                    else None
+                ),
+                positions=(
+                    [PositionOut.model_validate(item) for item in positions]
+                    if positions is not None
+                    else None
+                ),
+            )
+            nodes[department.id] = node
+            parent = nodes.get(department.parent_department)
+            if parent is None:
+                roots.append(node)
+            else:
+                parent.children.append(node)
+        return roots
+
+    @atomic(read_only=True)
+    async def get_breadcrumbs(
+        self,
+        user: User,
+        department_ids: list[int],
+        include_heads: bool = False,
+    ) -> list[DepartmentBreadcrumb]:
+        """
+        Get chains of ancestors of many departments of user's company.
+
+        :param user: request user.
+        :param department_ids: IDs of departments, at most as many as
+         the maximum page size.
+        :param include_heads: whether to include heads of departments.
+        :return: breadcrumbs in the order of requested IDs, unknown
+         departments are skipped.
+        """
+        department_ids = list(dict.fromkeys(department_ids))
+        if len(department_ids) > settings.pagination.max_limit:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="Too many departments requested, at most "
+                f"{settings.pagination.max_limit} are allowed",
+            )
+        rows = await self.uow.departments.get_ancestors(
+            department_ids,
+            user.company_id,
+            include_heads,
         )
+        chains: dict[int, list[DepartmentCrumbOut]] = {}
+        for department_id, ancestor, head in rows:
+            chains.setdefault(department_id, []).append(
+                DepartmentCrumbOut(
+                    **self.validate_incoming_department(ancestor).model_dump(),
+                    head=(
+                        DepartmentHeadOut.model_validate(head)
+                        if head is not None
+                        else None
+                    ),
+                ),
+            )
         return [
-            self.validate_incoming_department(department)
-            for department in departments
+            DepartmentBreadcrumb(
+                department_id=department_id,
+                ancestors=chains[department_id],
+            )
+            for department_id in department_ids
+            if department_id in chains
         ]
 
     @atomic
     async def set_department_head(self, head: DepartmentHead) -> DepartmentOut:
         """Set head of a department."""
-        if await self.check_department_has_head(head.department_id):
+        assignment = await self.uow.departments.set_department_head(
+            **head.model_dump(),
+        )
+        if assignment.status is HeadAssignmentStatus.ALREADY_HAS_HEAD:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail="Department already has head",
             )
-        if not await self.check_user_in_requested_department(
-            head.user_id,
-            head.department_id,
-        ):
+        if assignment.status is HeadAssignmentStatus.NOT_IN_COMPANY:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail="Cannot set user as head of department,"
                 "as requested user is not in specified department",
             )
-        updated: (
-            Department | None
-        ) = await self.uow.departments.set_department_head(**head.model_dump())
-        if updated:
-            return self.validate_incoming_department(updated)
-        raise HTTPException(
-            status_code=HTTPStatus.NOT_FOUND,
-            detail="Department not found",
-        )
+        # Department is returned only if it was assigned.
+        department = assignment.department
+        if department is None:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail="Department not found",
+            )
+        await self._departments_changed(department.company_id)
+        return self.validate_incoming_department(department)
 
     @atomic
     async def update_department(
@@ -151,6 +525,7 @@ class DepartmentService(BaseService):
                 **department_data.model_dump(exclude_unset=True),
             )
         )
+        await self._departments_changed(new_department.company_id)
         return self.validate_incoming_department(new_department)
 
     @atomic
@@ -171,3 +546,156 @@ class DepartmentService(BaseService):
                 "Please move or delete them before proceeding.",
             )
         await self.uow.departments.delete_department(department_id)
+        await self._departments_changed(department.company_id)
+
+    @atomic
+    async def import_org_chart(
+        self,
+        user: User,
+        chart: OrgChartImport,
+    ) -> OrgChartOut:
+        """
+        Import a whole tree of departments with their positions.
+
+        All Ltree paths are computed in memory and checked for conflicts
+        with a single query, then departments and positions are inserted
+        with a few multi-row statements in one transaction. Nothing is
+        imported if any problem is found.
+
+        :param user: request user, who performs the import.
+        :param chart: org chart in nested or adjacency list form.
+        :return: created departments and positions.
+        """
+        if user.role != Role.ADMIN:
+            raise HTTPException(
+                status_code=HTTPStatus.FORBIDDEN,
+                detail="Only admin can import departments",
+            )
+        errors: list[str] = []
+        departments = _flatten_org_chart(chart, errors)
+        base_path: Optional[str] = None
+        if chart.parent_department is not None:
+            parent: Optional[Department]
+            parent = await self.uow.departments.get_by_query_one_or_none(
+                id=chart.parent_department,
+                company_id=user.company_id,
+            )
+            if parent is None:
+                errors.append(
+                    "Parent department with specified id does not exist.",
+                )
+            else:
+                base_path = str(parent.path)
+        paths = _compute_paths(departments, base_path, errors)
+        if errors:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=errors,
+            )
+        conflicts = await self.uow.departments.get_conflicting_departments(
+            user.company_id,
+            list(paths),
+            list(paths.values()),
+        )
+        if conflicts:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=[
+                    f"Department '{name}' with path '{path}' already exists"
+                    for name, path in conflicts
+                ],
+            )
+        ids = dict(
+            zip(
+                paths,
+                await self.uow.departments.allocate_ids(len(paths)),
+                strict=True,
+            ),
+        )
+        department_rows = [
+            dict(
+                id=ids[department.name],
+                name=department.name,
+                path=Ltree(paths[department.name]),
+                parent_department=(
+                    ids[department.parent]
+                    if department.parent is not None
+                    else chart.parent_department
+                ),
+                company_id=user.company_id,
+            )
+            for department in departments
+        ]
+        position_rows = [
+            dict(title=title, department_id=ids[department.name])
+            for department in departments
+            for title in department.positions
+        ]
+        try:
+            created: Sequence[Department]
+            created = await self.uow.departments.add_many(department_rows)
+            positions: Sequence[Position]
+            positions = await self.uow.positions.add_many(position_rows)
+        except IntegrityError:
+            raise HTTPException(
+                status_code=HTTPStatus.CONFLICT,
+                detail="Departments were changed concurrently,"
+                " please retry the import",
+            )
+        await self._departments_changed(user.company_id)
+        return OrgChartOut(
+            departments=[
+                self.validate_incoming_department(department)
+                for department in created
+            ],
+            positions=[
+                PositionOut.model_validate(position) for position in positions
+            ],
+        )
+
+    async def _departments_changed(self, company_id: int) -> None:
+        """
+        Bump version of departments of the company.
+
+        Version is bumped in the current transaction, so that cached
+        subtrees of the company stop being used in every worker right
+        after commit; this worker also drops them from its cache.
+        """
+        version = await self.uow.companies.bump_departments_version(
+            company_id,
+        )
+        self.uow.on_commit(partial(invalidate_company, company_id, version))
+
+    def export_departments(
+        self,
+        user: UserOut,
+        export_format: ExportFormat,
+    ) -> AsyncIterator[str]:
+        """
+        Export all departments of the company of given admin.
+
+        :param user: request user, who performs the export.
+        :param export_format: format of the export.
+        :return: async iterator of encoded chunks.
+        """
+        if user.role != Role.ADMIN:
+            raise HTTPException(
+                status_code=HTTPStatus.FORBIDDEN,
+                detail="Only admin can export departments",
+            )
+        return encode_rows(
+            self._stream_departments(user.company_id),
+            DepartmentOut,
+            export_format,
+        )
+
+    async def _stream_departments(
+        self,
+        company_id: int,
+    ) -> AsyncIterator[DepartmentOut]:
+        """Stream departments of the company, as DepartmentOut schemas."""
+        async for department in self._stream(
+            "stream_by_query",
+            company_id=company_id,
+        ):
+            yield self.validate_incoming_department(department)
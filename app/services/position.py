@@ -1,20 +1,24 @@
+from collections.abc import AsyncIterator
 from http import HTTPStatus
-from typing import Optional, TYPE_CHECKING
+from typing import Optional
 
 from fastapi.exceptions import HTTPException
 
+from app.core.config import settings
+from app.repositories.position import AssignmentStatus
+from app.schemas.exports import ExportFormat
 from app.schemas.position import (
     PositionIn,
     PositionOut,
     UserPositionIn,
     UserPositionOut,
+    UserPositionResult,
     PositionUpdate,
 )
+from app.schemas.user import UserOut
 from app.services.base import BaseService, atomic
-
-
-if TYPE_CHECKING:
-    from app.models.company import UserPosition
+from app.models.user import Role, User
+from app.utils.exports import encode_rows
 
 
 class PositionService(BaseService):
@@ -26,7 +30,7 @@ class PositionService(BaseService):
 
     base_repository: str = "positions"
 
-    @atomic
+    @atomic(read_only=True)
     async def check_user_in_requested_company(
         self,
         user_id: int,
@@ -38,7 +42,7 @@ class PositionService(BaseService):
             position_id,
         )
 
-    @atomic
+    @atomic(read_only=True)
     async def check_user_has_requested_position(
         self,
         user_id: int,
@@ -50,7 +54,7 @@ class PositionService(BaseService):
             position_id,
         )
 
-    @atomic
+    @atomic(read_only=True)
     async def check_position_has_assigned_users(
         self,
         position_id: int,
@@ -71,43 +75,83 @@ class PositionService(BaseService):
     async def assign_position(
         self,
         assignee: UserPositionIn,
-    ) -> UserPositionOut | dict:
+    ) -> UserPositionOut:
         """Assign position to employee."""
-        if not await self.check_user_in_requested_company(
-            assignee.user_id,
-            assignee.position_id,
-        ):
+        assignment = await self.uow.positions.assign_position(
+            **assignee.model_dump(),
+        )
+        if assignment.status is AssignmentStatus.POSITION_NOT_FOUND:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail="Position not found",
+            )
+        if assignment.status is AssignmentStatus.NOT_IN_COMPANY:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail="Cannot assign employee to desired position, "
                 "as employee is not in requested company",
             )
-        if await self.check_user_has_requested_position(
-            assignee.user_id,
-            assignee.position_id,
+        if (
+            assignment.status is AssignmentStatus.ALREADY_ASSIGNED
+            or assignment.user_position_id is None
         ):
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail="Requested user is already assigned "
                 "to specified position.",
             )
-        position = await self.uow.positions.get_position_by_id(
-            assignee.position_id,
-        )  # type: ignore[func-returns-value]
-        if position:
-            user_position: UserPosition = (
-                await self.uow.positions.assign_position(
-                    **assignee.model_dump(),
-                )
+        return UserPositionOut(
+            position=PositionOut.model_validate(assignment.position),
+            user_id=assignee.user_id,
+            id=assignment.user_position_id,
+        )
+
+    @atomic
+    async def assign_positions(
+        self,
+        user: User,
+        assignees: list[UserPositionIn],
+    ) -> list[UserPositionResult]:
+        """
+        Assign many employees to positions of current user's company.
+
+        Invalid pairs don't prevent valid ones from being assigned,
+        outcome of every pair is returned instead. All pairs are assigned
+        with one statement, so their amount is limited by configuration.
+        """
+        if len(assignees) > settings.data_import.max_assignments:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="Too many assignments requested, at most "
+                f"{settings.data_import.max_assignments} are allowed",
             )
-            return UserPositionOut(
-                position=position,
+        assignments = await self.uow.positions.assign_positions(
+            [
+                (assignee.user_id, assignee.position_id)
+                for assignee in assignees
+            ],
+            user.company_id,
+        )
+        return [
+            UserPositionResult(
                 user_id=assignee.user_id,
-                id=user_position.id,
+                position_id=assignee.position_id,
+                status=assignment.status.value,
+                id=assignment.user_position_id,
+                position=(
+                    PositionOut.model_validate(assignment.position)
+                    if assignment.position is not None
+                    else None
+                ),
             )
-        return {"detail": "Position not found"}
+            for assignee, assignment in zip(
+                assignees,
+                assignments,
+                strict=True,
+            )
+        ]
 
-    @atomic
+    @atomic(read_only=True)
     async def get_position(self, position_id: int) -> Optional[PositionOut]:
         """Get position by given position id."""
         return await self.uow.positions.get_position_by_id(
@@ -140,3 +184,34 @@ class PositionService(BaseService):
                 detail="Cannot delete position with assigned users",
             )
         await self.uow.positions.delete_position(position_id)
+
+    def export_positions(
+        self,
+        user: UserOut,
+        export_format: ExportFormat,
+    ) -> AsyncIterator[str]:
+        """
+        Export all positions of the company of given admin.
+
+        :param user: request user, who performs the export.
+        :param export_format: format of the export.
+        :return: async iterator of encoded chunks.
+        """
+        if user.role != Role.ADMIN:
+            raise HTTPException(
+                status_code=HTTPStatus.FORBIDDEN,
+                detail="Only admin can export positions",
+            )
+        return encode_rows(
+            self._stream_positions(user.company_id),
+            PositionOut,
+            export_format,
+        )
+
+    async def _stream_positions(
+        self,
+        company_id: int,
+    ) -> AsyncIterator[PositionOut]:
+        """Stream positions of the company, as PositionOut schemas."""
+        async for position in self._stream("stream_by_company", company_id):
+            yield PositionOut.model_validate(position)
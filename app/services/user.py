@@ -1,11 +1,32 @@
+import logging
+from collections.abc import AsyncIterable, AsyncIterator, Sequence
+from functools import partial
 from http import HTTPStatus
 
 from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 
+from app.core.config import settings
 from app.schemas.auth import InviteChallenge
-from app.schemas.user import UserOut
+from app.schemas.exports import ExportFormat
+from app.schemas.imports import ImportReport, ImportRowError
+from app.schemas.user import EmployeeImportRow, UserOut
 from app.services.base import BaseService, atomic
-from app.models.user import User
+from app.units_of_work.base import UnitOfWork
+from app.models.user import Role, User
+from app.utils.auth import hash_passwords_async, principals
+from app.utils.exceptions import PasswordHashingOverloadedError
+from app.utils.exports import encode_rows
+from app.utils.imports import ImportRecord, format_validation_errors
+
+logger = logging.getLogger(__name__)
+
+
+def _record_account(record: ImportRecord) -> str | None:
+    """Get account of import record, if it has a readable one."""
+    account = (record.data or {}).get("account")
+    return account if isinstance(account, str) else None
 
 
 class UserService(BaseService):
@@ -17,7 +38,7 @@ class UserService(BaseService):
 
     base_repository: str = "users"
 
-    @atomic
+    @atomic(read_only=True)
     async def check_user_is_admin_in_org(
         self,
         user: User,
@@ -43,26 +64,34 @@ class UserService(BaseService):
         :param new_employee_account: account for generating invite.
         :return: an instance of InviteChallenge.
         """
-        if await self.uow.companies.check_token_exists(new_employee_account):
+        issue = await self.uow.companies.issue_invite(
+            new_employee_account,
+            inviter_id=user.id,
+        )
+        if issue.token_exists:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail="Cannot generate invite for given email,"
                 " as invite token for that email already exists",
             )
-        if await self.uow.users.check_account_exists(new_employee_account):
+        if issue.account_taken:
             raise HTTPException(
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail="Cannot generate invite for given email,"
                 " as it's already taken, please choose another one",
             )
-        if await self.check_user_is_admin_in_org(user):
-            return await self.uow.companies.generate_invite_code(
-                new_employee_account,
+        if not issue.inviter_is_admin:
+            raise HTTPException(
+                status_code=HTTPStatus.FORBIDDEN,
+                detail="Only admin can invite new employees",
             )
-        raise HTTPException(
-            status_code=HTTPStatus.FORBIDDEN,
-            detail="Only admin can invite new employees",
-        )
+        if issue.invite is None:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail="Cannot generate invite for given email,"
+                " as invite token for that email already exists",
+            )
+        return issue.invite
 
     @atomic
     async def change_account(self, user: User, new_account: str) -> UserOut:
@@ -80,7 +109,9 @@ class UserService(BaseService):
                 status_code=HTTPStatus.BAD_REQUEST,
                 detail="Email already taken",
             )
-        return await self.uow.users.change_account(user, new_account)
+        updated = await self.uow.users.change_account(user, new_account)
+        self.uow.on_commit(partial(principals.delete, user.id))
+        return updated
 
     @atomic
     async def change_credentials(
@@ -96,9 +127,14 @@ class UserService(BaseService):
          will be changed.
         :return: instance of user.
         """
-        return await self.uow.users.change_credentials(user, **new_credentials)
+        updated = await self.uow.users.change_credentials(
+            user,
+            **new_credentials,
+        )
+        self.uow.on_commit(partial(principals.delete, user.id))
+        return updated
 
-    @atomic
+    @atomic(read_only=True)
     async def get_self_info(self, user: User) -> UserOut:
         """
         Return information about current user.
@@ -107,3 +143,247 @@ class UserService(BaseService):
         :return: instance of user.
         """
         return UserOut.model_validate(user)
+
+    async def import_employees(
+        self,
+        user: UserOut,
+        records: AsyncIterable[ImportRecord],
+    ) -> ImportReport:
+        """
+        Import employees into the company of given admin.
+
+        Records are validated, hashed and inserted batch by batch, while
+        the body is still being received, so only one batch is kept in
+        memory. Every batch is checked and inserted in short blocks of
+        dedicated Units of Work, so that no transaction is kept open
+        while bcrypt is running. A batch, which fails to be hashed or
+        inserted, doesn't stop the import: its rows are reported as
+        rejected, while rows of other batches stay committed.
+
+        :param user: request user, who performs the import.
+        :param records: records, read from request body.
+        :return: import report with errors of every rejected row.
+        """
+        if user.role != Role.ADMIN:
+            raise HTTPException(
+                status_code=HTTPStatus.FORBIDDEN,
+                detail="Only admin can import employees",
+            )
+        report = ImportReport()
+        seen_accounts: set[str] = set()
+        batch: list[ImportRecord] = []
+        async for record in records:
+            report.total += 1
+            batch.append(record)
+            if len(batch) >= settings.data_import.batch_size:
+                await self._import_batch(
+                    batch,
+                    user.company_id,
+                    seen_accounts,
+                    report,
+                )
+                batch = []
+        await self._import_batch(
+            batch,
+            user.company_id,
+            seen_accounts,
+            report,
+        )
+        report.errors.sort(key=lambda error: error.line)
+        return report
+
+    async def _import_batch(
+        self,
+        records: Sequence[ImportRecord],
+        company_id: int,
+        seen_accounts: set[str],
+        report: ImportReport,
+    ) -> None:
+        """
+        Validate, hash and insert batch of records.
+
+        If the batch fails, its rows, which were not rejected yet, are
+        reported as rejected with the reason of the failure.
+        """
+        reported = len(report.errors)
+        try:
+            prepared = await self._prepare_employees(
+                records,
+                company_id,
+                seen_accounts,
+                report,
+            )
+            if prepared:
+                await self._insert_employees(prepared, report)
+        except PasswordHashingOverloadedError as exception:
+            reason = str(exception)
+        except SQLAlchemyError:
+            logger.exception("Failed to import batch of employees")
+            reason = "Batch of rows could not be saved"
+        else:
+            return
+        rejected = {error.line for error in report.errors[reported:]}
+        for record in records:
+            if record.line in rejected:
+                continue
+            report.errors.append(
+                ImportRowError(
+                    line=record.line,
+                    account=_record_account(record),
+                    errors=[f"Not imported: {reason}"],
+                ),
+            )
+
+    async def _prepare_employees(
+        self,
+        records: Sequence[ImportRecord],
+        company_id: int,
+        seen_accounts: set[str],
+        report: ImportReport,
+    ) -> list[tuple[int, dict]]:
+        """
+        Validate batch of records and hash passwords of valid ones.
+
+        Rows with accounts, which are repeated in the body or already
+        taken, are rejected before hashing, so that bcrypt is not wasted.
+
+        :return: line numbers and data of rows, which are ready to insert.
+        """
+        valid: list[tuple[int, EmployeeImportRow]] = []
+        for record in records:
+            if record.error is not None:
+                report.errors.append(
+                    ImportRowError(line=record.line, errors=[record.error]),
+                )
+                continue
+            try:
+                row = EmployeeImportRow.model_validate(record.data)
+            except ValidationError as exception:
+                report.errors.append(
+                    ImportRowError(
+                        line=record.line,
+                        account=_record_account(record),
+                        errors=format_validation_errors(exception),
+                    ),
+                )
+                continue
+            if row.account in seen_accounts:
+                report.errors.append(
+                    ImportRowError(
+                        line=record.line,
+                        account=row.account,
+                        errors=["Account is repeated in the import"],
+                    ),
+                )
+                continue
+            seen_accounts.add(row.account)
+            valid.append((record.line, row))
+        taken = await self._get_existing_accounts(
+            [row.account for _, row in valid],
+        )
+        ready: list[tuple[int, EmployeeImportRow]] = []
+        for line, row in valid:
+            if row.account in taken:
+                report.errors.append(
+                    ImportRowError(
+                        line=line,
+                        account=row.account,
+                        errors=["Email already taken"],
+                    ),
+                )
+            else:
+                ready.append((line, row))
+        hashed = await hash_passwords_async([row.password for _, row in ready])
+        return [
+            (
+                line,
+                dict(
+                    first_name=row.first_name,
+                    last_name=row.last_name,
+                    account=row.account,
+                    password=password.decode("utf-8"),
+                    role=Role.USER,
+                    company_id=company_id,
+                ),
+            )
+            for (line, row), password in zip(ready, hashed, strict=True)
+        ]
+
+    @staticmethod
+    async def _get_existing_accounts(accounts: list[str]) -> set[str]:
+        """
+        Get accounts, which are already taken, out of given ones.
+
+        Dedicated Unit of Work releases its connection right after the
+        check, before passwords are hashed.
+        """
+        if not accounts:
+            return set()
+        uow = UnitOfWork()
+        async with uow.read_only():
+            return await uow.users.get_existing_accounts(accounts)
+
+    @staticmethod
+    async def _insert_employees(
+        prepared: Sequence[tuple[int, dict]],
+        report: ImportReport,
+    ) -> None:
+        """
+        Insert prepared employees and update the report.
+
+        Employees are inserted and committed in a dedicated Unit of Work.
+        Accounts, which were taken since they were checked, are skipped
+        by the database and reported as rejected rows.
+        """
+        uow = UnitOfWork()
+        async with uow:
+            created: Sequence[User] = await uow.users.upsert_many(
+                [employee for _, employee in prepared],
+                index_elements=["account"],
+                batch_size=settings.data_import.batch_size,
+            )
+        inserted = {employee.account for employee in created}
+        report.created += len(inserted)
+        report.errors.extend(
+            ImportRowError(
+                line=line,
+                account=employee["account"],
+                errors=["Email already taken"],
+            )
+            for line, employee in prepared
+            if employee["account"] not in inserted
+        )
+
+    def export_employees(
+        self,
+        user: UserOut,
+        export_format: ExportFormat,
+    ) -> AsyncIterator[str]:
+        """
+        Export all employees of the company of given admin.
+
+        :param user: request user, who performs the export.
+        :param export_format: format of the export.
+        :return: async iterator of encoded chunks.
+        """
+        if user.role != Role.ADMIN:
+            raise HTTPException(
+                status_code=HTTPStatus.FORBIDDEN,
+                detail="Only admin can export employees",
+            )
+        return encode_rows(
+            self._stream_employees(user.company_id),
+            UserOut,
+            export_format,
+        )
+
+    async def _stream_employees(
+        self,
+        company_id: int,
+    ) -> AsyncIterator[UserOut]:
+        """Stream employees of the company, as UserOut schemas."""
+        async for employee in self._stream(
+            "stream_by_query",
+            company_id=company_id,
+        ):
+            yield UserOut.model_validate(employee)
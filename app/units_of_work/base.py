@@ -1,8 +1,20 @@
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
 from functools import wraps
-from typing import Any, Awaitable, Callable, Optional, Protocol
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    NamedTuple,
+    Optional,
+    Protocol,
+)
 from types import TracebackType
 
-from app.database.db import AsyncSessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction
+
+from app.core.config import settings
+from app.database.db import AsyncSessionLocal, ReadOnlySessionLocal
 from app.models.user import User
 from app.models.company import Company, Department, Position
 from app.repositories.auth import AuthRepository
@@ -13,16 +25,30 @@ from app.repositories.position import PositionRepository
 
 
 def atomic(
-    func: Callable[..., Awaitable[Any]],
-) -> Callable[..., Awaitable[Any]]:
-    """Decorate function with transaction mode."""
+    func: Optional[Callable[..., Awaitable[Any]]] = None,
+    *,
+    read_only: bool = False,
+) -> Any:
+    """
+    Decorate function with transaction mode.
+
+    Can be used either as ``@atomic`` or as ``@atomic(read_only=True)``,
+    the latter runs the function in a read-only block of Unit of Work.
+    """
+
+    def decorator(
+        func: Callable[..., Awaitable[Any]],
+    ) -> Callable[..., Awaitable[Any]]:
+        @wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            async with self.uow.read_only() if read_only else self.uow:
+                return await func(self, *args, **kwargs)
 
-    @wraps(func)
-    async def wrapper(self, *args, **kwargs):
-        async with self.uow:
-            return await func(self, *args, **kwargs)
+        return wrapper
 
-    return wrapper
+    if func is None:
+        return decorator
+    return decorator(func)
 
 
 class AbstractUnitOfWork(Protocol):
@@ -61,26 +87,63 @@ class AbstractUnitOfWork(Protocol):
         ...
 
 
+class _Scope(NamedTuple):
+    """Single level of nested Unit of Work blocks."""
+
+    session: AsyncSession
+    savepoint: Optional[AsyncSessionTransaction]
+    read_only: bool
+
+
 class UnitOfWork:
-    """The class responsible for the atomicity of transactions."""
+    """
+    The class responsible for the atomicity of transactions.
 
-    def __init__(self) -> None:
-        """Initialize the class, adding session_factory."""
+    Unit of Work is reentrant: nested ``async with`` blocks reuse the
+    session and transaction of the outermost one, and only the outermost
+    exit commits or rolls back. If ``use_savepoints`` is enabled, every
+    nested block runs in a SAVEPOINT, so that a failed nested call can be
+    handled by the caller without losing the whole transaction.
+
+    Blocks opened via ``read_only()`` use a separate session bound to the
+    read-only engine, unless they are nested in a writing block or
+    something was already written in this Unit of Work: then they reuse
+    the writing session to see its changes. Once the primary was read
+    by ``read_only(primary=True)``, the rest of the reads go to it too,
+    so that they never see an older state than that read. If nothing
+    was written, the outermost exit rolls the primary back instead of
+    committing it.
+
+    Callbacks registered with ``on_commit()`` run after the outermost
+    block commits, and are dropped if the transaction, or the savepoint
+    they were registered in, is rolled back.
+    """
+
+    def __init__(
+        self,
+        use_savepoints: bool = settings.database.use_savepoints,
+    ) -> None:
+        """Initialize the class, adding session factories."""
         self.session_factory = AsyncSessionLocal
+        self.read_only_session_factory = ReadOnlySessionLocal
+        self.use_savepoints = use_savepoints
+        self.session: Optional[AsyncSession] = None
+        self.read_only_session: Optional[AsyncSession] = None
+        self._scopes: list[_Scope] = []
+        self._bound_session: Optional[AsyncSession] = None
+        self._written = False
+        self._snapshot = False
+        self._on_commit: list[tuple[int, Callable[[], Any]]] = []
 
     async def __aenter__(self) -> None:
         """
         Initialize the context manager.
 
-        Initialization includes creating a session via session factory,
-        and also injecting model-specific repositories.
+        Initialization of the outermost block includes creating a session
+        via session factory, and also injecting model-specific
+        repositories. Nested blocks only open a savepoint, if enabled.
         """
-        self.session = self.session_factory()
-        self.users = UserRepository(self.session, User)
-        self.companies = CompanyRepository(self.session, Company)
-        self.auth = AuthRepository(self.session, User)
-        self.departments = DepartmentRepository(self.session, Department)
-        self.positions = PositionRepository(self.session, Position)
+        await self._enter(read_only=False)
 
     async def __aexit__(
         self,
@@ -91,20 +154,176 @@ class UnitOfWork:
         """
         Close context manager.
 
-        If there were no exceptions, commit transaction, rollback it otherwise.
+        If there were no exceptions and something was written, commit
+        transaction, rollback it otherwise. Nested blocks release or
+        roll back their savepoint instead.
+
+        Close the sessions afterward.
+        """
+        depth = len(self._scopes)
+        scope = self._scopes.pop()
+        if scope.savepoint is not None:
+            if not exc_type:
+                await scope.savepoint.commit()
+            else:
+                await scope.savepoint.rollback()
+                self._on_commit = [
+                    (level, callback)
+                    for level, callback in self._on_commit
+                    if level < depth
+                ]
+        if self._scopes:
+            self._bind(self._session_for(self._scopes[-1].read_only))
+            return
+        callbacks, self._on_commit = self._on_commit, []
+        try:
+            if exc_type:
+                await self.rollback()
+                callbacks = []
+            elif self._written:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            await self._close()
+        for _, callback in callbacks:
+            callback()
 
-        Close the session afterward.
+    @asynccontextmanager
+    async def read_only(
+        self,
+        snapshot: bool = False,
+        primary: bool = False,
+    ) -> AsyncIterator[None]:
         """
-        if not exc_type:
-            await self.commit()
-        else:
-            await self.rollback()
-        await self.session.close()
+        Open a read-only block.
+
+        Outermost read-only blocks never commit, as there is nothing
+        to commit, and their queries may be served by a replica.
+
+        :param snapshot: run reads of the outermost block in a single
+         REPEATABLE READ transaction, so that they all see the same
+         state of the database. Server-side cursors need it, as they
+         can't live outside of a transaction.
+        :param primary: read from the primary, for reads which must not
+         lag behind. Unless a snapshot is open, the read-only session
+         is closed, returning its connection to the pool, so objects
+         loaded by it become detached.
+        """
+        await self._enter(read_only=True, primary=primary)
+        session = self.read_only_session
+        if (
+            snapshot
+            and len(self._scopes) == 1
+            and session is not None
+            and self._bound_session is session
+        ):
+            self._snapshot = True
+            await session.connection(
+                execution_options={"isolation_level": "REPEATABLE READ"},
+            )
+        try:
+            yield
+        except BaseException as error:
+            await self.__aexit__(type(error), error, error.__traceback__)
+            raise
+        await self.__aexit__(None, None, None)
+
+    def on_commit(self, callback: Callable[[], Any]) -> None:
+        """
+        Register callback to run once the transaction is committed.
+
+        Used for side effects, such as cache invalidation, which must
+        not happen if changes are rolled back, and must not happen
+        before other requests can see the changes.
+
+        :param callback: function without arguments.
+        """
+        if not self._scopes:
+            callback()
+            return
+        self._on_commit.append((len(self._scopes), callback))
 
     async def commit(self) -> None:
         """Commit changes to the database."""
-        await self.session.commit()
+        if self.session is not None:
+            await self.session.commit()
 
     async def rollback(self) -> None:
         """Rollback pending changes."""
-        await self.session.rollback()
+        if self.session is not None:
+            await self.session.rollback()
+
+    async def _enter(self, read_only: bool, primary: bool = False) -> None:
+        """Open new block, choosing session for it."""
+        session = self._session_for(read_only, primary)
+        if (
+            primary
+            and not self._snapshot
+            and self.read_only_session is not None
+            and self.read_only_session is not session
+        ):
+            await self.read_only_session.close()
+        self._written = self._written or not read_only
+        savepoint = None
+        if (
+            self.use_savepoints
+            and session is self.session
+            and any(scope.session is session for scope in self._scopes)
+        ):
+            savepoint = await session.begin_nested()
+        self._scopes.append(_Scope(session, savepoint, read_only))
+        self._bind(session)
+
+    def _session_for(
+        self,
+        read_only: bool,
+        primary: bool = False,
+    ) -> AsyncSession:
+        """Get session for a block, creating it if needed."""
+        writing = self.session is not None and (
+            self.session.in_transaction()
+            or any(not scope.read_only for scope in self._scopes)
+        )
+        if read_only and not writing and not primary:
+            if self.read_only_session is None:
+                self.read_only_session = self.read_only_session_factory()
+            return self.read_only_session
+        if self.session is None:
+            self.session = self.session_factory()
+        return self.session
+
+    def _bind(self, session: AsyncSession) -> None:
+        """Inject model-specific repositories, working with session."""
+        if session is self._bound_session:
+            return
+        self._bound_session = session
+        self.users = UserRepository(session, User)
+        self.companies = CompanyRepository(session, Company)
+        self.auth = AuthRepository(session, User)
+        self.departments = DepartmentRepository(session, Department)
+        self.positions = PositionRepository(session, Position)
+
+    async def _close(self) -> None:
+        """Close all sessions of the Unit of Work."""
+        sessions = (self.session, self.read_only_session)
+        self.session = self.read_only_session = self._bound_session = None
+        self._written = self._snapshot = False
+        for session in sessions:
+            if session is not None:
+                await session.close()
+
+
+async def get_unit_of_work() -> AsyncGenerator[UnitOfWork, None]:
+    """
+    Provide Unit of Work for the whole request.
+
+    Request is wrapped into a read-only block, so that every service
+    call of the request is nested in it: all of them share one session
+    and one transaction, which is committed once the request is handled.
+    Reads made before anything is written are served by the read-only
+    engine.
+    """
+    uow = UnitOfWork()
+    async with uow.read_only():
+        yield uow
@@ -1,10 +1,33 @@
+import asyncio
 import datetime
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from hashlib import sha256
 from secrets import token_hex
+from typing import Any, Callable, Sequence
 
 import bcrypt
 import jwt
 
 from app.core.config import settings
+from app.core.metrics import (
+    PASSWORD_HASHING_DURATION,
+    PASSWORD_HASHING_JOBS_QUEUED,
+    PASSWORD_HASHING_JOBS_RUNNING,
+)
+from app.utils.cache import LRUCache
+from app.utils.exceptions import PasswordHashingOverloadedError
+
+verified_tokens = LRUCache(
+    "verified_tokens",
+    settings.auth_jwt.verified_tokens_cache_size,
+)
+# Invalidated on commit only in the current worker, other workers see
+# changes once entries expire, see AuthJWT.principals_cache_ttl_seconds.
+principals = LRUCache("principals", settings.auth_jwt.principals_cache_size)
 
 
 def encode_jwt(
@@ -46,6 +69,26 @@ def decode_jwt(
     return decoded
 
 
+def decode_jwt_cached(token: str | bytes) -> dict:
+    """
+    Decode JWT token, skipping signature check for recently verified ones.
+
+    Verified payloads are cached by SHA-256 digest of the token until
+    the token expires, so that clients polling with the same token
+    don't pay for RSA verification on every request.
+
+    :param token: encoded JWT token.
+    :return: decoded JWT token in dictionary format.
+    """
+    raw_token = token.encode("utf-8") if isinstance(token, str) else token
+    key = sha256(raw_token).digest()
+    if (payload := verified_tokens.get(key)) is not None:
+        return payload
+    payload = decode_jwt(token)
+    verified_tokens.set(key, payload, expires_at=payload.get("exp"))
+    return payload
+
+
 def hash_password(password: str) -> bytes:
     """
     Hash incoming password.
@@ -67,6 +110,157 @@ def verify_password(password: str, hashed_password: bytes) -> bool:
     return bcrypt.checkpw(password.encode("utf-8"), hashed_password)
 
 
+class PasswordHashingPool:
+    """
+    Bounded pool for running bcrypt outside the event loop.
+
+    Jobs are executed either on threads or on processes, depending on
+    settings. Amount of submitted and not finished jobs is limited by
+    ``max_queue_size``, jobs above that limit are rejected right away,
+    so that a login burst can't pile up unlimited work.
+    """
+
+    def __init__(
+        self,
+        executor: str = settings.password_hashing.executor,
+        max_workers: int = settings.password_hashing.max_workers,
+        max_queue_size: int = settings.password_hashing.max_queue_size,
+    ) -> None:
+        """Initialize the pool, executor itself is created lazily."""
+        self.executor_type = executor
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.pending_jobs = 0
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        """Get executor, creating it on first use."""
+        if self._executor is None:
+            executor_class = (
+                ProcessPoolExecutor
+                if self.executor_type == "process"
+                else ThreadPoolExecutor
+            )
+            self._executor = executor_class(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(
+        self,
+        operation: str,
+        func: Callable[..., Any],
+        *args: Any,
+    ) -> Any:
+        """
+        Run given function in the pool.
+
+        :param operation: name of the operation, used as metrics label.
+        :param func: function to run.
+        :param args: positional arguments of the function.
+        :return: result of the function.
+        :raises PasswordHashingOverloadedError: if the queue is full.
+        """
+        if self.pending_jobs >= self.max_queue_size:
+            raise PasswordHashingOverloadedError(
+                "Too many password hashing jobs, try again later.",
+            )
+        self._set_pending_jobs(self.pending_jobs + 1)
+        try:
+            with PASSWORD_HASHING_DURATION.labels(operation).time():
+                return await asyncio.get_running_loop().run_in_executor(
+                    self.executor,
+                    func,
+                    *args,
+                )
+        finally:
+            self._set_pending_jobs(self.pending_jobs - 1)
+
+    def _set_pending_jobs(self, pending_jobs: int) -> None:
+        """
+        Update amount of submitted and not finished jobs and its metrics.
+
+        Executor starts jobs in order of submission once a worker is free,
+        so jobs above ``max_workers`` are the ones waiting in its queue.
+        """
+        self.pending_jobs = pending_jobs
+        running = min(pending_jobs, self.max_workers)
+        PASSWORD_HASHING_JOBS_RUNNING.set(running)
+        PASSWORD_HASHING_JOBS_QUEUED.set(pending_jobs - running)
+
+    def shutdown(self) -> None:
+        """
+        Shut down the executor, if it was created.
+
+        Waits for running jobs to finish, so it blocks and must not be
+        called on the event loop.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hashing_pool = PasswordHashingPool()
+
+
+async def hash_password_async(password: str) -> bytes:
+    """
+    Hash incoming password in the password hashing pool.
+
+    :param password: plain password to hash.
+    :return: hashed password.
+    """
+    return await password_hashing_pool.run(
+        "hash",
+        bcrypt.hashpw,
+        password.encode("utf-8"),
+        bcrypt.gensalt(),
+    )
+
+
+async def hash_passwords_async(passwords: Sequence[str]) -> list[bytes]:
+    """
+    Hash many passwords in the password hashing pool, in parallel.
+
+    Passwords are submitted in slices of pool's ``max_workers``, so that
+    a big batch keeps all workers busy, but doesn't take the whole
+    queue from concurrent logins.
+
+    :param passwords: plain passwords to hash.
+    :return: hashed passwords, in the same order.
+    """
+    hashed: list[bytes] = []
+    step = password_hashing_pool.max_workers
+    for start in range(0, len(passwords), step):
+        hashed.extend(
+            await asyncio.gather(
+                *(
+                    hash_password_async(password)
+                    for password in passwords[start : start + step]
+                ),
+            ),
+        )
+    return hashed
+
+
+async def verify_password_async(
+    password: str,
+    hashed_password: bytes,
+) -> bool:
+    """
+    Verify incoming password in the password hashing pool.
+
+    :param password: plain password.
+    :param hashed_password: hashed password.
+    :return: True if passwords are equal, False otherwise.
+    """
+    return await password_hashing_pool.run(
+        "verify",
+        bcrypt.checkpw,
+        password.encode("utf-8"),
+        hashed_password,
+    )
+
+
 def generate_invite_code(n_bytes: int = 25) -> str:
     """
     Generate random invite code.
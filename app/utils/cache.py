@@ -0,0 +1,125 @@
+"""In-process caches, used to avoid repeating expensive work."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from app.core.metrics import CACHE_ENTRIES, CACHE_REQUESTS, CACHE_WEIGHT
+
+
+class LRUCache:
+    """
+    Size-bounded LRU cache with optional per-entry expiration.
+
+    Every instance is local to the worker process. Hits and misses are
+    exported to Prometheus under the name of the cache.
+
+    params:
+        - name: name of the cache, used as metrics label
+        - max_size: maximum amount of entries kept in the cache
+        - max_weight: maximum total weight of entries, unbounded if None
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        max_weight: int | None = None,
+    ) -> None:
+        """Initialize the cache."""
+        self.name = name
+        self.max_size = max_size
+        self.max_weight = max_weight
+        self.weight = 0
+        self._entries: OrderedDict[
+            Hashable,
+            tuple[Any, float | None, int],
+        ] = OrderedDict()
+        self._hits = CACHE_REQUESTS.labels(name, "hit")
+        self._misses = CACHE_REQUESTS.labels(name, "miss")
+        self._size = CACHE_ENTRIES.labels(name)
+        self._weight = CACHE_WEIGHT.labels(name)
+
+    def __len__(self) -> int:
+        """Return amount of entries in the cache."""
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Get value from the cache.
+
+        :param key: key of the entry.
+        :return: cached value, or None if it is missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at, _ = entry
+            if expires_at is None or expires_at > time.time():
+                self._entries.move_to_end(key)
+                self._hits.inc()
+                return value
+            self.delete(key)
+        self._misses.inc()
+        return None
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        expires_at: float | None = None,
+        weight: int = 1,
+    ) -> None:
+        """
+        Put value into the cache, evicting least recently used entries.
+
+        :param key: key of the entry.
+        :param value: value to store, must not be None.
+        :param expires_at: unix timestamp, after which entry is stale.
+        :param weight: approximate size of the value, counted against
+         ``max_weight``.
+        """
+        if self.max_weight is not None and weight > self.max_weight:
+            self.delete(key)
+            return
+        self._pop(key)
+        self._entries[key] = (value, expires_at, weight)
+        self.weight += weight
+        while len(self._entries) > self.max_size or (
+            self.max_weight is not None and self.weight > self.max_weight
+        ):
+            _, (_, _, evicted_weight) = self._entries.popitem(last=False)
+            self.weight -= evicted_weight
+        self._update_metrics()
+
+    def delete(self, key: Hashable) -> None:
+        """Remove entry from the cache, if it exists."""
+        self._pop(key)
+        self._update_metrics()
+
+    def delete_matching(self, predicate: Callable[[Hashable], bool]) -> None:
+        """
+        Remove all entries, keys of which match the predicate.
+
+        Scans the whole cache, so it is meant for rare invalidations.
+        """
+        for key in [key for key in self._entries if predicate(key)]:
+            self._pop(key)
+        self._update_metrics()
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        self._entries.clear()
+        self.weight = 0
+        self._update_metrics()
+
+    def _pop(self, key: Hashable) -> None:
+        """Remove entry, if it exists, without updating metrics."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.weight -= entry[2]
+
+    def _update_metrics(self) -> None:
+        """Export current size and weight of the cache."""
+        self._size.set(len(self._entries))
+        self._weight.set(self.weight)
@@ -0,0 +1,68 @@
+"""Cache of department subtrees, versioned per company."""
+
+from collections.abc import Hashable
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+# Keys start with company ID and version of its departments, so that
+# entries of older versions are never returned, even if this worker has
+# not yet seen the commit, which bumped the version.
+sub_departments = LRUCache(
+    "sub_departments",
+    settings.department_cache.max_entries,
+    max_weight=settings.department_cache.max_departments,
+)
+
+# The newest version of departments of companies, seen by this worker.
+# Versions only grow, so a request, which read an older version before
+# a concurrent commit, doesn't put its page back after invalidation.
+company_versions = LRUCache(
+    "company_versions",
+    settings.department_cache.max_companies,
+)
+
+
+def is_version_behind(company_id: int, version: int) -> bool:
+    """
+    Check if this worker has already seen newer version of departments.
+
+    :param company_id: ID of the company.
+    :param version: version of departments, read from the database.
+    :return: whether the version is older than already seen one.
+    """
+    known = company_versions.get(company_id)
+    return known is not None and known > version
+
+
+def set_company_version(company_id: int, version: int) -> bool:
+    """
+    Remember version of departments of the company, if it is the newest.
+
+    :param company_id: ID of the company.
+    :param version: version of departments, read from the database.
+    :return: whether the version is not older than already seen one.
+    """
+    if is_version_behind(company_id, version):
+        return False
+    company_versions.set(company_id, version)
+    return True
+
+
+def invalidate_company(company_id: int, version: int) -> None:
+    """
+    Drop cached subtrees of the company, older than given version.
+
+    :param company_id: ID of the company.
+    :param version: current version of departments of the company.
+    """
+    set_company_version(company_id, version)
+
+    def is_older(key: Hashable) -> bool:
+        return (
+            isinstance(key, tuple)
+            and key[0] == company_id
+            and key[1] < version
+        )
+
+    sub_departments.delete_matching(is_older)
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from typing import Any, Protocol
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+from email_validator import (
+    EmailUndeliverableError,
+    ValidatedEmail,
+    validate_email,
+)
+
+from app.core.config import settings
+from app.utils.cache import LRUCache
+
+deliverable_domains = LRUCache(
+    "email_domains",
+    settings.email_validation.cache_size,
+)
+
+
+class DomainResolver(Protocol):
+    """Asynchronous DNS resolver, compatible with dnspython one."""
+
+    async def resolve(
+        self,
+        qname: str,
+        rdtype: str,
+        *,
+        lifetime: float | None = None,
+    ) -> Any:
+        """Resolve records of given type for given name."""
+        ...
+
+
+_default_resolver: DomainResolver | None = None
+
+
+def get_default_resolver() -> DomainResolver:
+    """Get system DNS resolver, creating it on first use."""
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = dns.asyncresolver.Resolver()
+    return _default_resolver
+
+
+async def _accepts_email(
+    domain: str,
+    resolver: DomainResolver,
+    deadline: float,
+) -> bool:
+    """
+    Check whether domain has a host to deliver email to.
+
+    MX records are checked first, then A and AAAA records are used as
+    fallback, the same way ``email_validator`` does it. All lookups
+    share the same deadline, each one gets the time left until it.
+
+    :raises dns.exception.Timeout: if the deadline has passed.
+    """
+    loop = asyncio.get_running_loop()
+    for rdtype in ("MX", "A", "AAAA"):
+        lifetime = deadline - loop.time()
+        if lifetime <= 0:
+            raise dns.exception.Timeout
+        try:
+            answer = await resolver.resolve(domain, rdtype, lifetime=lifetime)
+        except dns.resolver.NXDOMAIN:
+            return False
+        except dns.resolver.NoAnswer:
+            continue
+        if rdtype != "MX":
+            return True
+        # Null MX record (RFC 7505) means domain does not accept email.
+        return any(record.exchange.to_text() != "." for record in answer)
+    return False
+
+
+async def check_domain_deliverability(
+    domain: str,
+    resolver: DomainResolver | None = None,
+) -> bool | None:
+    """
+    Check whether domain accepts email, without blocking the event loop.
+
+    Results are cached per domain, negative ones for a shorter time.
+    The whole check, including fallback lookups, is limited by
+    ``dns_timeout``. Lookups, which time out or fail on the DNS server
+    side, are not cached and treated as unknown.
+
+    :param domain: ASCII domain name.
+    :param resolver: resolver to use instead of the system one.
+    :return: True or False, or None if deliverability is unknown.
+    """
+    if (deliverable := deliverable_domains.get(domain)) is not None:
+        return deliverable
+    timeout = settings.email_validation.dns_timeout
+    try:
+        async with asyncio.timeout(timeout):
+            deliverable = await _accepts_email(
+                domain,
+                resolver or get_default_resolver(),
+                asyncio.get_running_loop().time() + timeout,
+            )
+    except (
+        TimeoutError,
+        dns.exception.Timeout,
+        dns.resolver.NoNameservers,
+    ):
+        return None
+    ttl = (
+        settings.email_validation.cache_ttl_seconds
+        if deliverable
+        else settings.email_validation.negative_cache_ttl_seconds
+    )
+    deliverable_domains.set(domain, deliverable, expires_at=time.time() + ttl)
+    return deliverable
+
+
+async def validate_email_async(
+    email: str,
+    check_deliverability: bool = (
+        settings.email_validation.check_deliverability
+    ),
+    resolver: DomainResolver | None = None,
+) -> ValidatedEmail:
+    """
+    Validate email syntax and, optionally, deliverability of its domain.
+
+    Unlike ``email_validator.validate_email``, DNS lookups don't block
+    the event loop. If deliverability can't be checked in time, email
+    is accepted.
+
+    :param email: email to validate.
+    :param check_deliverability: whether to check domain in DNS.
+    :param resolver: resolver to use instead of the system one.
+    :return: validated email.
+    :raises EmailNotValidError: if email is not valid.
+    """
+    validated = validate_email(email, check_deliverability=False)
+    if check_deliverability and (
+        await check_domain_deliverability(validated.ascii_domain, resolver)
+        is False
+    ):
+        raise EmailUndeliverableError(
+            f"The domain name {validated.ascii_domain} does not accept email.",
+        )
+    return validated
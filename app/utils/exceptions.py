@@ -3,3 +3,15 @@
 
 class ParentNotFoundError(Exception):
     """Parent of the department not found."""
+
+
+class DepartmentExistsError(Exception):
+    """Department with such name or path already exists in the company."""
+
+
+class PasswordHashingOverloadedError(Exception):
+    """Password hashing pool has too many pending jobs."""
+
+
+class InvalidCursorError(Exception):
+    """Pagination cursor is malformed or belongs to another list."""
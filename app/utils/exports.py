@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+
+from pydantic import BaseModel
+
+from app.schemas.exports import ExportFormat
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.JSONL: "application/x-ndjson",
+}
+CHUNK_SIZE = 64 * 1024
+
+
+async def encode_rows(
+    rows: AsyncIterable[BaseModel],
+    schema: type[BaseModel],
+    export_format: ExportFormat,
+) -> AsyncIterator[str]:
+    """
+    Encode rows of export incrementally.
+
+    Encoded rows are grouped into chunks of about ``CHUNK_SIZE``
+    characters, so that memory usage doesn't depend on amount of rows.
+
+    :param rows: rows to encode.
+    :param schema: schema of the rows, its fields are used as CSV header.
+    :param export_format: format of the export.
+    :return: async iterator of encoded chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format is ExportFormat.CSV:
+        writer.writerow(schema.model_fields)
+    async for row in rows:
+        data = row.model_dump(mode="json")
+        if export_format is ExportFormat.CSV:
+            writer.writerow(data.values())
+        else:
+            buffer.write(json.dumps(data, ensure_ascii=False))
+            buffer.write("\n")
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,165 @@
+import codecs
+import csv
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any, NamedTuple
+
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.schemas.imports import ImportFormat
+
+
+class ImportRecord(NamedTuple):
+    """Record read from import body, or the reason it can't be read."""
+
+    line: int
+    data: dict[str, Any] | None
+    error: str | None = None
+
+
+async def _iter_lines(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[tuple[int, str]]:
+    """
+    Split stream of bytes into numbered lines, as soon as they arrive.
+
+    :param chunks: chunks of UTF-8 encoded body.
+    :return: async iterator of line numbers and lines, with line endings.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    number = 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            number += 1
+            yield number, line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield number + 1, pending
+
+
+def _ends_in_quotes(line: str, in_quotes: bool) -> bool:
+    """
+    Check if a line ends inside a quoted value, as ``csv.reader`` reads it.
+
+    A quote opens a quoted value only at the start of a value, elsewhere
+    it is a literal character. A doubled quote inside a quoted value
+    doesn't close it.
+
+    :param line: line of CSV body.
+    :param in_quotes: whether the line starts inside a quoted value.
+    :return: whether the line ends inside a quoted value.
+    """
+    value_start = not in_quotes
+    position = 0
+    while position < len(line):
+        char = line[position]
+        if in_quotes:
+            if char == '"':
+                if line.startswith('"', position + 1):
+                    position += 1
+                else:
+                    in_quotes = False
+        elif char == '"' and value_start:
+            in_quotes = True
+        value_start = char == "," and not in_quotes
+        position += 1
+    return in_quotes
+
+
+async def _iter_csv_records(
+    lines: AsyncIterator[tuple[int, str]],
+) -> AsyncIterator[ImportRecord]:
+    """
+    Read CSV records, using the first one as header.
+
+    Quoted values may span several lines, record is parsed once all
+    of its quoted values are closed. A record, which grows longer than
+    configured maximum, is reported as not closed on its first line,
+    and reading goes on from the next line.
+    """
+    header: list[str] | None = None
+    start, record, in_quotes = 0, "", False
+    async for number, line in lines:
+        if not record:
+            start = number
+        record += line
+        in_quotes = _ends_in_quotes(line, in_quotes)
+        if in_quotes:
+            if len(record) > settings.data_import.max_csv_record_size:
+                yield ImportRecord(start, None, "Unterminated quoted value")
+                record, in_quotes = "", False
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield ImportRecord(
+                start,
+                None,
+                f"Expected {len(header)} columns, got {len(values)}",
+            )
+            continue
+        yield ImportRecord(start, dict(zip(header, values, strict=True)))
+    if record:
+        yield ImportRecord(start, None, "Unterminated quoted value")
+
+
+async def _iter_jsonl_records(
+    lines: AsyncIterator[tuple[int, str]],
+) -> AsyncIterator[ImportRecord]:
+    """Read JSON objects, one per line."""
+    async for number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as exception:
+            yield ImportRecord(number, None, f"Invalid JSON: {exception.msg}")
+            continue
+        if not isinstance(data, dict):
+            yield ImportRecord(number, None, "Expected JSON object")
+            continue
+        yield ImportRecord(number, data)
+
+
+def iter_import_records(
+    chunks: AsyncIterable[bytes],
+    import_format: ImportFormat,
+) -> AsyncIterator[ImportRecord]:
+    """
+    Read records of bulk import from streamed request body.
+
+    Body is never loaded into memory as a whole, records are produced
+    as soon as their lines are received.
+
+    :param chunks: chunks of request body.
+    :param import_format: format of the body.
+    :return: async iterator of records.
+    """
+    lines = _iter_lines(chunks)
+    if import_format is ImportFormat.CSV:
+        return _iter_csv_records(lines)
+    return _iter_jsonl_records(lines)
+
+
+def format_validation_errors(exception: ValidationError) -> list[str]:
+    """
+    Format pydantic validation errors for import report.
+
+    :param exception: raised validation error.
+    :return: list of messages, prefixed with field names.
+    """
+    return [
+        ".".join(map(str, error["loc"])) + f": {error['msg']}"
+        if error["loc"]
+        else error["msg"]
+        for error in exception.errors()
+    ]
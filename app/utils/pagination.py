@@ -0,0 +1,54 @@
+import base64
+import binascii
+import json
+from typing import Any, Optional
+
+from app.core.config import settings
+from app.utils.exceptions import InvalidCursorError
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """
+    Get page size, capped by configured maximum.
+
+    :param limit: requested page size, default one is used if None.
+    :return: page size to use.
+    """
+    if limit is None:
+        return settings.pagination.default_limit
+    return max(1, min(limit, settings.pagination.max_limit))
+
+
+def encode_cursor(key: str, value: Any) -> str:
+    """
+    Encode position in a list into opaque cursor.
+
+    :param key: name of the column, list is ordered by.
+    :param value: value of the column in the last returned row.
+    :return: URL-safe cursor.
+    """
+    raw = json.dumps([key, value], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(key: str, cursor: Optional[str]) -> Any:
+    """
+    Decode cursor, made by ``encode_cursor``.
+
+    :param key: name of the column, list is ordered by.
+    :param cursor: cursor, passed by client.
+    :return: value of the column to continue after, or None if cursor
+     is not given.
+    :raises InvalidCursorError: if cursor is malformed or made for
+     a list ordered by another column.
+    """
+    if cursor is None:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_key, value = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursorError("Cursor is not valid")
+    if cursor_key != key or value is None:
+        raise InvalidCursorError("Cursor is not valid")
+    return value
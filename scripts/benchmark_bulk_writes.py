@@ -0,0 +1,183 @@
+"""
+Benchmark of bulk write primitives against loops of single-row calls.
+
+Inserts, upserts and updates the same synthetic employees with
+``add_many``, ``upsert_many`` and ``update_many`` of the base repository
+and with a loop of single-row calls. Every operation runs in a savepoint,
+which is rolled back, and the whole run in a transaction, which is rolled
+back in the end. Point it to a local database with the latest migrations
+applied::
+
+    python -m scripts.benchmark_bulk_writes --rows 10000
+
+Time of every operation is printed in seconds, with the speedup.
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Any, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.models.company import Company
+from app.models.user import Role, User
+from app.repositories.company import CompanyRepository
+from app.repositories.user import UserRepository
+
+Operation = Callable[[UserRepository, list[dict[str, Any]]], Awaitable[Any]]
+
+
+async def _insert_loop(
+    users: UserRepository,
+    rows: list[dict[str, Any]],
+) -> None:
+    for row in rows:
+        await users.add_one_and_get_obj(**row)
+
+
+async def _upsert_loop(
+    users: UserRepository,
+    rows: list[dict[str, Any]],
+) -> None:
+    for row in rows:
+        await users.upsert_many([row], ["account"], ["first_name"])
+
+
+async def _update_loop(
+    users: UserRepository,
+    rows: list[dict[str, Any]],
+) -> None:
+    for row in rows:
+        await users.update_one_by_id(row["id"], first_name=row["first_name"])
+
+
+def operations(batch_size: Optional[int]) -> dict[str, tuple[Operation, ...]]:
+    """
+    Get single-row and bulk variants of every benchmarked operation.
+
+    :param batch_size: amount of rows per statement of bulk variants.
+    :return: loop and bulk callables, by name of the operation.
+    """
+    return {
+        "insert": (
+            _insert_loop,
+            lambda users, rows: users.add_many(rows, batch_size),
+        ),
+        "upsert": (
+            _upsert_loop,
+            lambda users, rows: users.upsert_many(
+                rows,
+                ["account"],
+                ["first_name"],
+                batch_size,
+            ),
+        ),
+        "update": (
+            _update_loop,
+            lambda users, rows: users.update_many(rows, batch_size),
+        ),
+    }
+
+
+async def _timed(
+    session: AsyncSession,
+    users: UserRepository,
+    name: str,
+    operation: Operation,
+    rows: list[dict[str, Any]],
+) -> float:
+    """
+    Time an operation in a savepoint, which is rolled back afterward.
+
+    Upserts and updates are timed against already inserted rows, which
+    are expunged from the session first.
+
+    :return: time of the operation in seconds.
+    """
+    savepoint = await session.begin_nested()
+    try:
+        if name != "insert":
+            inserted: Sequence[User] = await users.add_many(rows)
+            if name == "update":
+                rows = [
+                    dict(id=user.id, first_name=f"Updated {user.id}")
+                    for user in inserted
+                ]
+            session.expunge_all()
+        started = time.perf_counter()
+        await operation(users, rows)
+        return time.perf_counter() - started
+    finally:
+        await savepoint.rollback()
+        session.expunge_all()
+
+
+async def benchmark(
+    amount: int,
+    batch_size: Optional[int],
+) -> dict[str, tuple[float, float]]:
+    """
+    Time loop and bulk variants of every operation.
+
+    :param amount: amount of rows written by every operation.
+    :param batch_size: amount of rows per statement of bulk variants.
+    :return: time of loop and of bulk variant in seconds, by operation.
+    """
+    engine = create_async_engine(settings.postgres_db_url, poolclass=NullPool)
+    timings = {}
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            users = UserRepository(session, User)
+            transaction = await session.begin()
+            try:
+                company: Company = await CompanyRepository(
+                    session,
+                    Company,
+                ).add_one_and_get_obj(company_name="Bulk writes benchmark")
+                rows = [
+                    dict(
+                        first_name="Employee",
+                        last_name=str(index),
+                        account=f"bulk-{company.id}-{index}@example.com",
+                        password="bulk-writes",
+                        role=Role.USER,
+                        company_id=company.id,
+                    )
+                    for index in range(amount)
+                ]
+                for name, (loop, bulk) in operations(batch_size).items():
+                    timings[name] = (
+                        await _timed(session, users, name, loop, rows),
+                        await _timed(session, users, name, bulk, rows),
+                    )
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare bulk writes with loops of single-row writes.",
+    )
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Rows per statement, DATABASE__BULK_BATCH_SIZE by default.",
+    )
+    args = parser.parse_args()
+    timings = asyncio.run(benchmark(args.rows, args.batch_size))
+    print(f"{'operation':<10}  {'loop s':>8}  {'bulk s':>8}  {'speedup':>8}")
+    for name, (loop, bulk) in timings.items():
+        print(f"{name:<10}  {loop:8.2f}  {bulk:8.2f}  {loop / bulk:7.1f}x")
+    print(f"rows per operation: {args.rows}")
+
+
+if __name__ == "__main__":
+    main()
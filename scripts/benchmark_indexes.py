@@ -0,0 +1,179 @@
+"""
+Benchmark of hot path queries with and without their indexes.
+
+Seeds a synthetic company with a balanced tree of 100k departments, times
+the queries, which indexes of migration ``4f7b9c1e6d25`` are made for,
+then drops these indexes and times the same queries again. Everything
+runs in a single transaction, which is rolled back in the end, so the
+dropped indexes are restored. Dropping an index locks its table, so point
+it to a local database with the latest migrations applied::
+
+    python -m scripts.benchmark_indexes --departments 100000
+
+Median and 95th percentile of every query are printed in milliseconds.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.models.auth import InviteChallenge
+from app.models.company import Company, Department, Position
+from app.models.user import User
+from app.repositories.base import SqlAlchemyRepository
+from app.repositories.company import CompanyRepository
+from app.repositories.department import DepartmentRepository
+from app.repositories.position import PositionRepository
+from app.repositories.user import UserRepository
+from scripts.plan_guard import Repositories, Seed, seed
+
+INDEXES = (
+    "ix_department_path_gist",
+    "ix_department_parent_department",
+    "ix_department_head_id",
+    "ix_position_department_id",
+    "ix_userposition_position_id",
+    "uq_userposition_user_id_position_id",
+    "ix_user_company_id",
+)
+
+
+QUERIES: dict[str, Callable[[Repositories, Seed], Awaitable[Any]]] = {
+    "descendants (path <@)": lambda r, s: r.departments.get_sub_departments(
+        s.department.id,
+        s.company_id,
+        50,
+    ),
+    "has sub-departments (path <@)": (
+        lambda r, s: r.departments.check_department_has_subdepartments(
+            s.department,
+        )
+    ),
+    "ancestors (path @>)": lambda r, s: r.departments.get_ancestors(
+        [s.leaf.id],
+        s.company_id,
+    ),
+    "position has employees": (
+        lambda r, s: r.positions.check_position_has_employees(s.position.id)
+    ),
+    "positions of employee": (
+        lambda r, s: r.positions.get_user_position(s.user.id)
+    ),
+    "employee is in company of position": (
+        lambda r, s: r.positions.check_user_in_requested_company(
+            s.user.id,
+            s.position.id,
+        )
+    ),
+    "departments headed by employee": (
+        lambda r, s: r.departments.get_page(50, head_id=s.user.id)
+    ),
+}
+
+
+async def measure(
+    repositories: Repositories,
+    seed_: Seed,
+    repeat: int,
+) -> dict[str, tuple[float, float]]:
+    """
+    Time every query several times, after a warm-up call.
+
+    :param repositories: repositories bound to the seeded session.
+    :param seed_: objects of the seeded company.
+    :param repeat: amount of timed calls of every query.
+    :return: median and 95th percentile in milliseconds, by query.
+    """
+    timings = {}
+    for name, query in QUERIES.items():
+        await query(repositories, seed_)
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await query(repositories, seed_)
+            samples.append((time.perf_counter() - started) * 1000)
+        repositories.users.session.expunge_all()
+        timings[name] = (
+            statistics.median(samples),
+            statistics.quantiles(samples, n=20)[-1],
+        )
+    return timings
+
+
+async def benchmark(
+    departments: int,
+    users: int,
+    repeat: int,
+) -> tuple[dict[str, tuple[float, float]], dict[str, tuple[float, float]]]:
+    """
+    Seed the company and time the queries with and without indexes.
+
+    :param departments: amount of departments of the company.
+    :param users: amount of users of the company.
+    :param repeat: amount of timed calls of every query.
+    :return: timings without indexes and timings with them.
+    """
+    engine = create_async_engine(settings.postgres_db_url, poolclass=NullPool)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            repositories = Repositories(
+                users=UserRepository(session, User),
+                companies=CompanyRepository(session, Company),
+                departments=DepartmentRepository(session, Department),
+                positions=PositionRepository(session, Position),
+                invites=SqlAlchemyRepository(session, InviteChallenge),
+            )
+            transaction = await session.begin()
+            try:
+                seed_ = await seed(repositories, 1, departments, users)
+                indexed = await measure(repositories, seed_, repeat)
+                for index in INDEXES:
+                    await session.execute(
+                        text(f"DROP INDEX IF EXISTS {index}"),
+                    )
+                await session.execute(
+                    text('ANALYZE "user", department, position, userposition'),
+                )
+                unindexed = await measure(repositories, seed_, repeat)
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+    return unindexed, indexed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time hot path queries with and without indexes.",
+    )
+    parser.add_argument("--departments", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    unindexed, indexed = asyncio.run(
+        benchmark(args.departments, args.users, args.repeat),
+    )
+    width = max(map(len, QUERIES))
+    print(
+        f"{'query':<{width}}  {'before p50/p95 ms':>19}"
+        f"  {'after p50/p95 ms':>19}  {'speedup':>8}",
+    )
+    for name in QUERIES:
+        before, after = unindexed[name], indexed[name]
+        print(
+            f"{name:<{width}}  {before[0]:9.2f}/{before[1]:9.2f}"
+            f"  {after[0]:9.2f}/{after[1]:9.2f}"
+            f"  {before[0] / after[0]:7.1f}x",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Load test of ``/users/me`` latency during a storm of logins.
+
+Probes ``GET /api/v1/users/me`` of a running server, first alone and then
+while many clients log in at once, and prints percentiles of both runs.
+Logins hash passwords with bcrypt, so if the hashing blocked the event
+loop, p99 of the probe would grow by hundreds of milliseconds during the
+storm. Run the server, ``--url`` is http://localhost:8000 by default,
+and point the test to an existing account::
+
+    python -m scripts.load_test_login --account a@example.com --password pw
+
+Only the standard library is used, every client runs in a thread of its
+own over a keep-alive connection.
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+LOGIN_PATH = "/api/v1/auth/jwt/login"
+PROBE_PATH = "/api/v1/users/me"
+
+
+class Client:
+    """
+    HTTP client over a single keep-alive connection.
+
+    params:
+        - url: base URL of the server
+    """
+
+    def __init__(self, url: str) -> None:
+        """Initialize the client."""
+        parts = urlsplit(url)
+        connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.connection = connection_class(parts.netloc, timeout=30)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: str | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> tuple[int, bytes]:
+        """
+        Send a request and read the whole response.
+
+        :return: status code and body of the response.
+        """
+        self.connection.request(method, path, body, headers or {})
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+    def login(self, account: str, password: str) -> tuple[int, bytes]:
+        """Log in with the form, used by OAuth2 password flow."""
+        return self.request(
+            "POST",
+            LOGIN_PATH,
+            urlencode(dict(username=account, password=password)),
+            {"Content-Type": "application/x-www-form-urlencoded"},
+        )
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """
+    Get median, 95th and 99th percentiles of latencies.
+
+    :param samples: latencies in milliseconds.
+    :return: percentiles by name.
+    """
+    cuts = statistics.quantiles(samples, n=100)
+    return dict(p50=statistics.median(samples), p95=cuts[94], p99=cuts[98])
+
+
+def probe(url: str, token: str, stop: threading.Event) -> list[float]:
+    """
+    Request the current user until stopped.
+
+    :return: latencies of requests in milliseconds.
+    """
+    client = Client(url)
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        status, _ = client.request("GET", PROBE_PATH, headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            raise RuntimeError(f"{PROBE_PATH} returned {status}")
+    return latencies
+
+
+def storm(
+    url: str,
+    account: str,
+    password: str,
+    stop: threading.Event,
+) -> Counter[int]:
+    """
+    Log in until stopped.
+
+    :return: amount of responses by status code.
+    """
+    client = Client(url)
+    statuses: Counter[int] = Counter()
+    while not stop.is_set():
+        status, _ = client.login(account, password)
+        statuses[status] += 1
+    return statuses
+
+
+def run(
+    url: str,
+    token: str,
+    duration: float,
+    logins: tuple[str, str, int] | None = None,
+) -> tuple[list[float], Counter[int]]:
+    """
+    Probe the server for a while, with or without concurrent logins.
+
+    :param url: base URL of the server.
+    :param token: access token of the probing client.
+    :param duration: duration of the run in seconds.
+    :param logins: account, password and amount of logging in clients.
+    :return: latencies of the probe and statuses of logins.
+    """
+    stop = threading.Event()
+    account, password, clients = logins or ("", "", 0)
+    with ThreadPoolExecutor(clients + 1) as executor:
+        stormers = [
+            executor.submit(storm, url, account, password, stop)
+            for _ in range(clients)
+        ]
+        prober = executor.submit(probe, url, token, stop)
+        time.sleep(duration)
+        stop.set()
+        statuses = sum(
+            (future.result() for future in stormers),
+            Counter(),
+        )
+        return prober.result(), statuses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure /users/me latency during a login storm.",
+    )
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--account", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=32,
+        help="Amount of clients, logging in at once.",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=20.0,
+        help="Duration of every run in seconds.",
+    )
+    args = parser.parse_args()
+    status, body = Client(args.url).login(args.account, args.password)
+    if status != 200:
+        parser.error(f"Login failed with {status}: {body.decode()}")
+    token = json.loads(body)["access_token"]
+    idle, _ = run(args.url, token, args.duration)
+    loaded, statuses = run(
+        args.url,
+        token,
+        args.duration,
+        (args.account, args.password, args.clients),
+    )
+    print(
+        f"{'run':<8}  {'requests':>8}  {'p50 ms':>8}  {'p95 ms':>8}  "
+        f"{'p99 ms':>8}",
+    )
+    for name, samples in (("idle", idle), ("storm", loaded)):
+        cuts = percentiles(samples)
+        print(
+            f"{name:<8}  {len(samples):8d}  {cuts['p50']:8.1f}"
+            f"  {cuts['p95']:8.1f}  {cuts['p99']:8.1f}",
+        )
+    print(
+        "logins: "
+        + ", ".join(
+            f"{amount} x {status}"
+            for status, amount in sorted(statuses.items())
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
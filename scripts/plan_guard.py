@@ -0,0 +1,732 @@
+"""
+Regression guard for query plans of repository methods.
+
+Seeds synthetic companies, calls every public method of repositories and
+checks plans of all statements they execute with ``EXPLAIN (FORMAT
+JSON)``. Everything runs in a single transaction, which is rolled back in
+the end, every method is called in a savepoint of its own. Point it to a
+local database with the latest migrations applied::
+
+    python -m scripts.plan_guard --report plans.json
+
+The report lists node types of plans of every method with forbidden
+sequential scans in them, sorted, so that it can be diffed between
+commits. Plans are estimated, so the report has no costs, which drift
+with statistics, and the tables are vacuumed first, so that dead rows of
+previous runs don't change the plans. The process exits with a non-zero
+code if a plan violates the rules below, costs too much, a method fails
+or has no scenario.
+
+The guard also runs as a test, marked ``plan_guard``, which is skipped
+if no database is reachable::
+
+    python -m pytest -m plan_guard
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    Sequence,
+)
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from sqlalchemy import event, text
+from sqlalchemy.engine.interfaces import ExecuteStyle
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncSession,
+    create_async_engine,
+)
+from sqlalchemy.pool import NullPool
+from sqlalchemy_utils import Ltree
+
+from app.core.config import settings
+from app.models.auth import InviteChallenge
+from app.models.company import Company, Department, Position, UserPosition
+from app.models.user import Role, User
+from app.repositories.base import SqlAlchemyRepository
+from app.repositories.company import CompanyRepository
+from app.repositories.department import DepartmentRepository
+from app.repositories.position import PositionRepository
+from app.repositories.user import UserRepository
+
+# Tables, which are large enough on real tenants, that a sequential scan
+# of them is always a regression.
+FORBIDDEN_SEQ_SCANS = frozenset({"department", "userposition"})
+# Methods, which are expected to scan these tables anyway.
+ALLOWED_SEQ_SCANS: dict[str, frozenset[str]] = {}
+DEFAULT_MAX_COST = 1_000.0
+MAX_COST: dict[str, float] = {
+    "DepartmentRepository.get_tree": 5_000.0,
+    "PositionRepository.stream_by_company": 5_000.0,
+}
+TREE_FANOUT = 5
+# Sizes of seeded data, rules above are tuned for them.
+DEFAULT_COMPANIES = 20
+DEFAULT_DEPARTMENTS = 500
+DEFAULT_USERS = 500
+SEEDED_TABLES = 'company, "user", department, position, userposition'
+
+
+class Repositories(NamedTuple):
+    """Repositories bound to the session of the guard."""
+
+    users: UserRepository
+    companies: CompanyRepository
+    departments: DepartmentRepository
+    positions: PositionRepository
+    invites: SqlAlchemyRepository
+
+
+class Seed(NamedTuple):
+    """
+    Detached objects of the seeded company, which scenarios operate on.
+
+    ``department`` has sub-departments, ``leaf`` has neither
+    sub-departments nor positions, ``vacant`` has no employees.
+    """
+
+    company_id: int
+    user: User
+    department: Department
+    leaf: Department
+    position: Position
+    vacant: Position
+
+
+class StatementPlan(NamedTuple):
+    """Plan of a single statement executed by a repository method."""
+
+    plan: dict[str, Any]
+    violations: list[str]
+    over_cost: bool
+
+
+Scenario = Callable[[Repositories, Seed], Awaitable[Any]]
+
+
+async def _drain(objects: AsyncIterator[Any]) -> None:
+    async for _ in objects:
+        pass
+
+
+def _new_department(seed: Seed) -> Department:
+    return Department(
+        name="Plan guard",
+        parent_department=seed.department.id,
+        company_id=seed.company_id,
+    )
+
+
+def _new_user(seed: Seed) -> dict[str, Any]:
+    return dict(
+        first_name="Plan",
+        last_name="Guard",
+        account="plan-guard@example.com",
+        password="plan-guard",
+        company_id=seed.company_id,
+    )
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "SqlAlchemyRepository.add_one": lambda r, s: r.positions.add_one(
+        title="Plan guard",
+        department_id=s.department.id,
+    ),
+    "SqlAlchemyRepository.add_one_and_get_id": (
+        lambda r, s: r.positions.add_one_and_get_id(
+            title="Plan guard",
+            department_id=s.department.id,
+        )
+    ),
+    "SqlAlchemyRepository.add_one_and_get_obj": (
+        lambda r, s: r.positions.add_one_and_get_obj(
+            title="Plan guard",
+            department_id=s.department.id,
+        )
+    ),
+    "SqlAlchemyRepository.add_many": lambda r, s: r.positions.add_many(
+        [
+            dict(title=f"Plan guard {i}", department_id=s.department.id)
+            for i in range(10)
+        ],
+    ),
+    "SqlAlchemyRepository.upsert_many": lambda r, s: r.users.upsert_many(
+        [
+            dict(
+                first_name="Plan",
+                last_name="Guard",
+                account=s.user.account,
+                password=s.user.password,
+                role=Role.USER,
+                company_id=s.company_id,
+            ),
+        ],
+        index_elements=["account"],
+    ),
+    "SqlAlchemyRepository.get_by_query_one_or_none": (
+        lambda r, s: r.departments.get_by_query_one_or_none(
+            id=s.department.id,
+        )
+    ),
+    "SqlAlchemyRepository.stream_by_query": lambda r, s: _drain(
+        r.users.stream_by_query(company_id=s.company_id),
+    ),
+    "SqlAlchemyRepository.get_page": lambda r, s: r.departments.get_page(
+        50,
+        company_id=s.company_id,
+    ),
+    "SqlAlchemyRepository.update_one_by_id": (
+        lambda r, s: r.positions.update_one_by_id(
+            s.position.id,
+            title="Plan guard",
+        )
+    ),
+    "SqlAlchemyRepository.update_many": lambda r, s: r.departments.update_many(
+        [dict(id=s.leaf.id, name="Plan guard")],
+    ),
+    "SqlAlchemyRepository.delete_by_query": (
+        lambda r, s: r.positions.delete_by_query(id=s.vacant.id)
+    ),
+    "SqlAlchemyRepository.delete_all": lambda r, s: r.invites.delete_all(),
+    "CompanyRepository.check_token_exists": (
+        lambda r, s: r.companies.check_token_exists(s.user.account)
+    ),
+    "CompanyRepository.issue_invite": lambda r, s: r.companies.issue_invite(
+        "plan-guard@example.com",
+        inviter_id=s.user.id,
+    ),
+    "CompanyRepository.verify_invite": lambda r, s: r.companies.verify_invite(
+        s.user.account,
+        "plan-guard",
+    ),
+    "CompanyRepository.create_company": (
+        lambda r, s: r.companies.create_company(company_name="Plan guard")
+    ),
+    "CompanyRepository.get_departments_version": (
+        lambda r, s: r.companies.get_departments_version(s.company_id)
+    ),
+    "CompanyRepository.bump_departments_version": (
+        lambda r, s: r.companies.bump_departments_version(s.company_id)
+    ),
+    "DepartmentRepository.generate_department_path": (
+        lambda r, s: r.departments.generate_department_path(
+            _new_department(s),
+        )
+    ),
+    "DepartmentRepository.create_department": (
+        lambda r, s: r.departments.create_department(_new_department(s))
+    ),
+    "DepartmentRepository.get_conflicting_departments": (
+        lambda r, s: r.departments.get_conflicting_departments(
+            s.company_id,
+            [s.department.name],
+            [str(s.department.path)],
+        )
+    ),
+    "DepartmentRepository.allocate_ids": (
+        lambda r, s: r.departments.allocate_ids(10)
+    ),
+    "DepartmentRepository.check_department_has_subdepartments": (
+        lambda r, s: r.departments.check_department_has_subdepartments(
+            s.department,
+        )
+    ),
+    "DepartmentRepository.get_sub_departments": (
+        lambda r, s: r.departments.get_sub_departments(
+            s.department.id,
+            s.company_id,
+            50,
+        )
+    ),
+    "DepartmentRepository.get_tree": lambda r, s: r.departments.get_tree(
+        s.company_id,
+        root_id=s.department.id,
+        include_heads=True,
+        include_positions=True,
+    ),
+    "DepartmentRepository.get_ancestors": (
+        lambda r, s: r.departments.get_ancestors(
+            [s.department.id, s.leaf.id],
+            s.company_id,
+            include_heads=True,
+        )
+    ),
+    "DepartmentRepository.check_user_in_requested_department": (
+        lambda r, s: r.departments.check_user_in_requested_department(
+            s.user.id,
+            s.department.id,
+        )
+    ),
+    "DepartmentRepository.check_department_has_head": (
+        lambda r, s: r.departments.check_department_has_head(
+            s.department.id,
+        )
+    ),
+    "DepartmentRepository.set_department_head": (
+        lambda r, s: r.departments.set_department_head(s.user.id, s.leaf.id)
+    ),
+    "DepartmentRepository.update_department": (
+        lambda r, s: r.departments.update_department(
+            s.leaf.id,
+            name="Plan guard",
+        )
+    ),
+    "DepartmentRepository.update_descendent_paths": (
+        lambda r, s: r.departments.update_descendent_paths(
+            s.department.path,
+            Ltree("Plan_guard"),
+        )
+    ),
+    "DepartmentRepository.delete_department": (
+        lambda r, s: r.departments.delete_department(s.leaf.id)
+    ),
+    "PositionRepository.check_user_in_requested_company": (
+        lambda r, s: r.positions.check_user_in_requested_company(
+            s.user.id,
+            s.position.id,
+        )
+    ),
+    "PositionRepository.check_position_has_employees": (
+        lambda r, s: r.positions.check_position_has_employees(s.position.id)
+    ),
+    "PositionRepository.create_position": (
+        lambda r, s: r.positions.create_position(
+            title="Plan guard",
+            department_id=s.department.id,
+        )
+    ),
+    "PositionRepository.stream_by_company": lambda r, s: _drain(
+        r.positions.stream_by_company(s.company_id),
+    ),
+    "PositionRepository.assign_position": (
+        lambda r, s: r.positions.assign_position(s.user.id, s.vacant.id)
+    ),
+    "PositionRepository.assign_positions": (
+        lambda r, s: r.positions.assign_positions(
+            [(s.user.id, s.vacant.id), (s.user.id, s.position.id)],
+            s.company_id,
+        )
+    ),
+    "PositionRepository.get_user_position": (
+        lambda r, s: r.positions.get_user_position(s.user.id)
+    ),
+    "PositionRepository.get_position_by_id": (
+        lambda r, s: r.positions.get_position_by_id(s.position.id)
+    ),
+    "PositionRepository.check_user_has_requested_position": (
+        lambda r, s: r.positions.check_user_has_requested_position(
+            s.user.id,
+            s.position.id,
+        )
+    ),
+    "PositionRepository.update_position": (
+        lambda r, s: r.positions.update_position(
+            s.position.id,
+            title="Plan guard",
+            department_id=s.leaf.id,
+        )
+    ),
+    "PositionRepository.delete_position": (
+        lambda r, s: r.positions.delete_position(s.vacant.id)
+    ),
+    "UserRepository.create_user": (
+        lambda r, s: r.users.create_user(**_new_user(s))
+    ),
+    "UserRepository.check_account_exists": (
+        lambda r, s: r.users.check_account_exists(s.user.account)
+    ),
+    "UserRepository.get_existing_accounts": (
+        lambda r, s: r.users.get_existing_accounts(
+            [s.user.account, "plan-guard@example.com"],
+        )
+    ),
+    "UserRepository.check_user_is_admin_in_org": (
+        lambda r, s: r.users.check_user_is_admin_in_org(s.user)
+    ),
+    "UserRepository.change_account": lambda r, s: r.users.change_account(
+        s.user,
+        "plan-guard@example.com",
+    ),
+    "UserRepository.change_credentials": (
+        lambda r, s: r.users.change_credentials(s.user, first_name="Plan")
+    ),
+}
+
+
+def public_methods() -> list[str]:
+    """
+    Get names of public methods of all repositories, querying database.
+
+    Static methods are skipped, as they don't use the session.
+
+    :return: sorted names in ``Class.method`` form.
+    """
+    names = []
+    classes: list[type[SqlAlchemyRepository]] = [
+        SqlAlchemyRepository,
+        *SqlAlchemyRepository.__subclasses__(),
+    ]
+    for cls in classes:
+        for name, attribute in vars(cls).items():
+            if name.startswith("_") or isinstance(attribute, staticmethod):
+                continue
+            if callable(attribute):
+                names.append(f"{cls.__name__}.{name}")
+    return sorted(names)
+
+
+def _tree_rows(
+    ids: list[int],
+    company_id: int,
+    heads: list[int],
+) -> list[dict[str, Any]]:
+    """
+    Build rows of a balanced department tree, in breadth-first order.
+
+    :param ids: IDs of departments.
+    :param company_id: ID of the company.
+    :param heads: IDs of users, first departments are headed by.
+    :return: rows of departments, the last one is a leaf.
+    """
+    rows: list[dict[str, Any]] = []
+    for index, department_id in enumerate(ids):
+        parent = rows[(index - 1) // TREE_FANOUT] if index else None
+        label = f"Department_{index}"
+        rows.append(
+            dict(
+                id=department_id,
+                name=f"Department {index}",
+                path=Ltree(f"{parent['path']}.{label}" if parent else label),
+                parent_department=parent["id"] if parent else None,
+                company_id=company_id,
+                head_id=heads[index] if index < len(heads) else None,
+            ),
+        )
+    return rows
+
+
+async def _seed_company(
+    repositories: Repositories,
+    company_id: int,
+    departments: int,
+    users: int,
+) -> Seed:
+    """
+    Seed departments, positions and employees of a company.
+
+    Every department but the last one gets a position, employees are
+    assigned to them in turn, tenth of departments get heads.
+    """
+    employees: Sequence[User] = await repositories.users.add_many(
+        [
+            dict(
+                first_name="Employee",
+                last_name=str(index),
+                account=f"plan-guard-{company_id}-{index}@example.com",
+                password="plan-guard",
+                role=Role.ADMIN if index == 0 else Role.USER,
+                company_id=company_id,
+            )
+            for index in range(users)
+        ],
+    )
+    ids = await repositories.departments.allocate_ids(departments)
+    tree: Sequence[Department] = await repositories.departments.add_many(
+        _tree_rows(
+            ids,
+            company_id,
+            [user.id for user in employees[: departments // 10]],
+        ),
+    )
+    positions: Sequence[Position] = await repositories.positions.add_many(
+        [
+            dict(title="Employee", department_id=department.id)
+            for department in tree[:-1]
+        ]
+        + [dict(title="Vacant", department_id=tree[0].id)],
+    )
+    await SqlAlchemyRepository(
+        repositories.users.session,
+        UserPosition,
+    ).add_many(
+        [
+            dict(
+                user_id=user.id,
+                position_id=positions[index % (len(tree) - 1)].id,
+            )
+            for index, user in enumerate(employees)
+        ],
+    )
+    return Seed(
+        company_id=company_id,
+        user=employees[1],
+        department=tree[1],
+        leaf=tree[-1],
+        position=positions[1],
+        vacant=positions[-1],
+    )
+
+
+async def seed(
+    repositories: Repositories,
+    companies: int,
+    departments: int,
+    users: int,
+) -> Seed:
+    """
+    Seed synthetic companies and collect statistics of the tables.
+
+    :param repositories: repositories to seed data with.
+    :param companies: amount of companies.
+    :param departments: amount of departments per company.
+    :param users: amount of users per company, at least 2.
+    :return: objects of the company in the middle of seeded ones.
+    """
+    created: Sequence[Company] = await repositories.companies.add_many(
+        [
+            dict(company_name=f"Plan guard {index}")
+            for index in range(companies)
+        ],
+    )
+    seeds = [
+        await _seed_company(repositories, company.id, departments, users)
+        for company in created
+    ]
+    session = repositories.users.session
+    await session.execute(
+        text(f"ANALYZE {SEEDED_TABLES}"),
+    )
+    session.expunge_all()
+    return seeds[len(seeds) // 2]
+
+
+@contextmanager
+def capture_statements(
+    connection: AsyncConnection,
+    statements: list[tuple[str, Any]],
+) -> Iterator[None]:
+    """
+    Collect statements and parameters executed on the connection.
+
+    :param connection: connection to listen to.
+    :param statements: list to collect statements into.
+    """
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        # Batches of "insertmanyvalues" are executed as single statements.
+        if context.execute_style is ExecuteStyle.EXECUTEMANY:
+            parameters = parameters[0]
+        statements.append((statement, parameters))
+
+    target = connection.sync_connection
+    event.listen(target, "before_cursor_execute", collect)
+    try:
+        yield
+    finally:
+        event.remove(target, "before_cursor_execute", collect)
+
+
+async def explain(
+    session: AsyncSession,
+    statement: str,
+    parameters: Any,
+) -> dict[str, Any]:
+    """
+    Get plan of a statement, without executing it.
+
+    :param session: session to explain the statement with.
+    :param statement: statement in the dialect's parameter style.
+    :param parameters: parameters of the statement.
+    :return: top node of the plan.
+    """
+    connection = await session.connection()
+    result = await connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {statement}",
+        parameters,
+    )
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def walk(
+    node: dict[str, Any],
+    depth: int = 0,
+) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Iterate over nodes of a plan with their depth, depth-first."""
+    yield depth, node
+    for child in node.get("Plans", ()):
+        yield from walk(child, depth + 1)
+
+
+def render(plan: dict[str, Any]) -> list[str]:
+    """Render a plan into lines, which are stable across runs."""
+    lines = []
+    for depth, node in walk(plan):
+        line = node["Node Type"]
+        if "Index Name" in node:
+            line += f" using {node['Index Name']}"
+        if "Relation Name" in node:
+            line += f" on {node['Relation Name']}"
+        lines.append("  " * depth + line)
+    return lines
+
+
+def check_plan(method: str, plan: dict[str, Any]) -> StatementPlan:
+    """
+    Check a plan of a method's statement against the rules.
+
+    :param method: name of the method in ``Class.method`` form.
+    :param plan: top node of the plan.
+    :return: plan with its forbidden scans and whether it costs too much.
+    """
+    forbidden = FORBIDDEN_SEQ_SCANS - ALLOWED_SEQ_SCANS.get(method, set())
+    violations = [
+        f"Seq Scan on {node['Relation Name']}"
+        for _, node in walk(plan)
+        if node["Node Type"] == "Seq Scan"
+        and node.get("Relation Name") in forbidden
+    ]
+    max_cost = MAX_COST.get(method, DEFAULT_MAX_COST)
+    return StatementPlan(plan, violations, plan["Total Cost"] > max_cost)
+
+
+async def run_scenario(
+    session: AsyncSession,
+    repositories: Repositories,
+    seed_: Seed,
+    method: str,
+) -> list[StatementPlan]:
+    """
+    Call a method in a savepoint and explain statements it executed.
+
+    :return: plans of executed statements.
+    """
+    statements: list[tuple[str, Any]] = []
+    savepoint = await session.begin_nested()
+    try:
+        with capture_statements(await session.connection(), statements):
+            await SCENARIOS[method](repositories, seed_)
+    finally:
+        await savepoint.rollback()
+        session.expunge_all()
+    plans = []
+    for statement, parameters in statements:
+        plan = await explain(session, statement, parameters)
+        plans.append(check_plan(method, plan))
+    return plans
+
+
+async def guard(
+    companies: int,
+    departments: int,
+    users: int,
+) -> tuple[dict[str, Any], dict[str, list[str]]]:
+    """
+    Seed data, run scenarios of all methods and build the report.
+
+    :param companies: amount of seeded companies.
+    :param departments: amount of departments per company.
+    :param users: amount of users per company.
+    :return: report and failures of methods, which did not pass.
+    """
+    engine = create_async_engine(settings.postgres_db_url, poolclass=NullPool)
+    report: dict[str, Any] = {}
+    failures: dict[str, list[str]] = {}
+    try:
+        async with engine.connect() as connection:
+            connection = await connection.execution_options(
+                isolation_level="AUTOCOMMIT",
+            )
+            await connection.execute(text(f"VACUUM {SEEDED_TABLES}"))
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            repositories = Repositories(
+                users=UserRepository(session, User),
+                companies=CompanyRepository(session, Company),
+                departments=DepartmentRepository(session, Department),
+                positions=PositionRepository(session, Position),
+                invites=SqlAlchemyRepository(session, InviteChallenge),
+            )
+            transaction = await session.begin()
+            try:
+                seed_ = await seed(repositories, companies, departments, users)
+                for method in public_methods():
+                    report[method], failed = await _report_method(
+                        session,
+                        repositories,
+                        seed_,
+                        method,
+                    )
+                    if failed:
+                        failures[method] = failed
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+    return report, failures
+
+
+async def _report_method(
+    session: AsyncSession,
+    repositories: Repositories,
+    seed_: Seed,
+    method: str,
+) -> tuple[dict[str, Any], list[str]]:
+    """Build report entry of a method and collect its failures."""
+    if method not in SCENARIOS:
+        return {"error": "No scenario"}, ["No scenario"]
+    try:
+        plans = await run_scenario(session, repositories, seed_, method)
+    except Exception as error:
+        return {"error": repr(error)}, [repr(error)]
+    entry = {
+        "statements": [
+            {"plan": render(plan.plan), "violations": plan.violations}
+            for plan in plans
+        ],
+    }
+    failures = [violation for plan in plans for violation in plan.violations]
+    if any(plan.over_cost for plan in plans):
+        max_cost = MAX_COST.get(method, DEFAULT_MAX_COST)
+        failures.append(f"Total cost exceeds {max_cost:.0f}")
+    return entry, failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Check query plans of repository methods.",
+    )
+    parser.add_argument("--report", type=Path, help="Path to the report.")
+    parser.add_argument("--companies", type=int, default=DEFAULT_COMPANIES)
+    parser.add_argument(
+        "--departments",
+        type=int,
+        default=DEFAULT_DEPARTMENTS,
+    )
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS)
+    args = parser.parse_args()
+    report, failures = asyncio.run(
+        guard(args.companies, args.departments, args.users),
+    )
+    dumped = json.dumps(report, indent=2, sort_keys=True)
+    if args.report:
+        args.report.write_text(dumped + "\n")
+    else:
+        print(dumped)
+    for method, failed in failures.items():
+        print(f"{method}: {failed}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
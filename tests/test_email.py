@@ -0,0 +1,165 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import dns.exception
+import dns.resolver
+from email_validator import EmailUndeliverableError
+
+from app.core.config import settings
+from app.utils.email import (
+    check_domain_deliverability,
+    deliverable_domains,
+    validate_email_async,
+)
+
+
+def mx(*exchanges: str) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(exchange=SimpleNamespace(to_text=lambda e=e: e))
+        for e in exchanges
+    ]
+
+
+class StubResolver:
+    """Resolver, which answers from a dict instead of DNS."""
+
+    def __init__(self, answers: dict, delay: float = 0.0) -> None:
+        self.answers = answers
+        self.delay = delay
+        self.queries: list[tuple[str, str, float]] = []
+
+    async def resolve(self, qname, rdtype, *, lifetime=None):
+        self.queries.append((qname, rdtype, lifetime))
+        await asyncio.sleep(self.delay)
+        answer = self.answers.get((qname, rdtype), dns.resolver.NoAnswer())
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class CheckDomainDeliverabilityTestCase(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        deliverable_domains.clear()
+
+    async def test_domain_with_mx_is_deliverable_and_cached(self):
+        resolver = StubResolver({("example.com", "MX"): mx("mx.example.com.")})
+
+        self.assertIs(
+            await check_domain_deliverability("example.com", resolver),
+            True,
+        )
+        self.assertIs(
+            await check_domain_deliverability("example.com", resolver),
+            True,
+        )
+        self.assertEqual(len(resolver.queries), 1)
+
+    async def test_null_mx_is_not_deliverable(self):
+        resolver = StubResolver({("example.com", "MX"): mx(".")})
+
+        self.assertIs(
+            await check_domain_deliverability("example.com", resolver),
+            False,
+        )
+
+    async def test_negative_result_expires_earlier(self):
+        resolver = StubResolver(
+            {("example.com", "MX"): dns.resolver.NXDOMAIN()},
+        )
+        ttl = settings.email_validation.negative_cache_ttl_seconds
+
+        for now in (1000.0, 1000.0 + ttl - 1, 1000.0 + ttl + 1):
+            with patch("time.time", return_value=now):
+                self.assertIs(
+                    await check_domain_deliverability("example.com", resolver),
+                    False,
+                )
+
+        self.assertEqual(len(resolver.queries), 2)
+
+    async def test_falls_back_to_address_records(self):
+        resolver = StubResolver({("example.com", "AAAA"): ["::1"]})
+
+        self.assertIs(
+            await check_domain_deliverability("example.com", resolver),
+            True,
+        )
+        self.assertEqual(
+            [rdtype for _, rdtype, _ in resolver.queries],
+            ["MX", "A", "AAAA"],
+        )
+
+    async def test_domain_without_records_is_not_deliverable(self):
+        self.assertIs(
+            await check_domain_deliverability("example.com", StubResolver({})),
+            False,
+        )
+
+    async def test_timeout_is_unknown_and_not_cached(self):
+        resolver = StubResolver(
+            {("example.com", "MX"): dns.exception.Timeout()},
+        )
+
+        self.assertIsNone(
+            await check_domain_deliverability("example.com", resolver),
+        )
+        self.assertIsNone(deliverable_domains.get("example.com"))
+
+    async def test_all_lookups_share_one_deadline(self):
+        resolver = StubResolver({}, delay=0.2)
+
+        with patch.object(settings.email_validation, "dns_timeout", 0.3):
+            started = time.monotonic()
+            result = await check_domain_deliverability("example.com", resolver)
+            elapsed = time.monotonic() - started
+
+        self.assertIsNone(result)
+        self.assertLess(elapsed, 0.5)
+        lifetimes = [lifetime for _, _, lifetime in resolver.queries]
+        self.assertEqual(len(lifetimes), 2)
+        self.assertLess(lifetimes[1], lifetimes[0])
+
+
+class ValidateEmailAsyncTestCase(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        deliverable_domains.clear()
+
+    async def test_syntax_only_mode_does_not_resolve(self):
+        resolver = StubResolver({})
+
+        validated = await validate_email_async(
+            "user@example.com",
+            check_deliverability=False,
+            resolver=resolver,
+        )
+
+        self.assertEqual(validated.normalized, "user@example.com")
+        self.assertEqual(resolver.queries, [])
+
+    async def test_undeliverable_domain_is_rejected(self):
+        resolver = StubResolver(
+            {("example.com", "MX"): dns.resolver.NXDOMAIN()},
+        )
+
+        with self.assertRaises(EmailUndeliverableError):
+            await validate_email_async(
+                "user@example.com",
+                check_deliverability=True,
+                resolver=resolver,
+            )
+
+    async def test_unknown_deliverability_is_accepted(self):
+        resolver = StubResolver(
+            {("example.com", "MX"): dns.exception.Timeout()},
+        )
+
+        validated = await validate_email_async(
+            "user@example.com",
+            check_deliverability=True,
+            resolver=resolver,
+        )
+
+        self.assertEqual(validated.ascii_domain, "example.com")
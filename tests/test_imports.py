@@ -0,0 +1,68 @@
+from collections.abc import AsyncIterator
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.schemas.imports import ImportFormat
+from app.utils.imports import ImportRecord, iter_import_records
+
+
+async def chunks(*parts: str) -> AsyncIterator[bytes]:
+    for part in parts:
+        yield part.encode("utf-8")
+
+
+async def read_csv(*parts: str) -> list[ImportRecord]:
+    return [
+        record
+        async for record in iter_import_records(
+            chunks(*parts),
+            ImportFormat.CSV,
+        )
+    ]
+
+
+class CsvRecordsTestCase(IsolatedAsyncioTestCase):
+    async def test_quoted_values_span_lines_and_chunks(self):
+        records = await read_csv(
+            "name,note\n",
+            'Ann,"first\nsec',
+            'ond ""quoted"""\nBob,x\n',
+        )
+
+        self.assertEqual(
+            records,
+            [
+                ImportRecord(
+                    2,
+                    {"name": "Ann", "note": 'first\nsecond "quoted"'},
+                ),
+                ImportRecord(4, {"name": "Bob", "note": "x"}),
+            ],
+        )
+
+    async def test_stray_quote_in_unquoted_value_is_literal(self):
+        records = await read_csv('name,note\nO"Brien,x\nBob,y\n')
+
+        self.assertEqual(
+            records,
+            [
+                ImportRecord(2, {"name": 'O"Brien', "note": "x"}),
+                ImportRecord(3, {"name": "Bob", "note": "y"}),
+            ],
+        )
+
+    async def test_unclosed_quoted_value_is_reported_on_its_line(self):
+        body = "name,note\n" + '"Ann,x\n' + "Bob,y\n" * 10 + "Eve,z\n"
+
+        with patch.object(settings.data_import, "max_csv_record_size", 40):
+            records = await read_csv(body)
+
+        self.assertEqual(
+            records[0],
+            ImportRecord(2, None, "Unterminated quoted value"),
+        )
+        self.assertEqual(
+            records[-1],
+            ImportRecord(13, {"name": "Eve", "note": "z"}),
+        )
@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from app.services.department import _compute_paths, _ImportedDepartment
+
+
+class ComputePathsTestCase(TestCase):
+    def test_names_are_turned_into_labels(self):
+        errors: list[str] = []
+
+        paths = _compute_paths(
+            [
+                _ImportedDepartment("Head office", None, []),
+                _ImportedDepartment("Sales team", "Head office", []),
+            ],
+            "Root",
+            errors,
+        )
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            paths,
+            {
+                "Head office": "Root.Head_office",
+                "Sales team": "Root.Head_office.Sales_team",
+            },
+        )
+
+    def test_names_with_invalid_labels_are_reported(self):
+        errors: list[str] = []
+
+        _compute_paths(
+            [
+                _ImportedDepartment(name, None, [])
+                for name in ("R&D", "Sales-EU", "Отдел", "x" * 256, "Ok")
+            ],
+            None,
+            errors,
+        )
+
+        self.assertEqual(len(errors), 4)
+        for name in ("R&D", "Sales-EU", "Отдел"):
+            self.assertTrue(any(f"'{name}'" in error for error in errors))
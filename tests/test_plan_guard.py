@@ -0,0 +1,39 @@
+from unittest import IsolatedAsyncioTestCase
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from scripts.plan_guard import (
+    DEFAULT_COMPANIES,
+    DEFAULT_DEPARTMENTS,
+    DEFAULT_USERS,
+    guard,
+)
+
+
+@pytest.mark.plan_guard
+class PlanGuardTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        engine = create_async_engine(
+            settings.postgres_db_url,
+            poolclass=NullPool,
+        )
+        try:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        except OSError as error:
+            self.skipTest(f"No database to check plans on: {error}")
+        finally:
+            await engine.dispose()
+
+    async def test_plans_of_repository_methods(self):
+        _, failures = await guard(
+            DEFAULT_COMPANIES,
+            DEFAULT_DEPARTMENTS,
+            DEFAULT_USERS,
+        )
+
+        self.assertEqual(failures, {})